@@ -0,0 +1,190 @@
+import threading
+import numpy as np
+import sounddevice as sd
+
+
+class RingBuffer:
+    """
+    Bounded float32 ring buffer shared between the audio callback and a worker.
+    When the worker falls behind, the oldest samples are overwritten and counted.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = int(capacity)
+        self.data = np.zeros(self.capacity, dtype=np.float32)
+        self.start = 0
+        self.size = 0
+        self.dropped = 0
+        self.overruns = 0
+        self.closed = False
+        self.cond = threading.Condition()
+
+    def write(self, samples):
+        """
+        Append samples, overwriting the oldest audio if the buffer is full.
+        Returns the number of samples that were dropped.
+        """
+        samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+        n = len(samples)
+        with self.cond:
+            if n >= self.capacity:
+                dropped = self.size + n - self.capacity
+                samples = samples[-self.capacity:]
+                n = self.capacity
+                self.start, self.size = 0, 0
+            else:
+                dropped = max(0, self.size + n - self.capacity)
+                if dropped:
+                    self.start = (self.start + dropped) % self.capacity
+                    self.size -= dropped
+
+            end = (self.start + self.size) % self.capacity
+            first = min(n, self.capacity - end)
+            self.data[end:end + first] = samples[:first]
+            self.data[:n - first] = samples[first:]
+            self.size += n
+
+            if dropped:
+                self.dropped += dropped
+                self.overruns += 1
+            self.cond.notify_all()
+        return dropped
+
+    def read(self, n, timeout=None):
+        """
+        Block until n samples are available and return them as a new array.
+        Returns None on timeout, or whatever is left once the buffer is closed.
+        """
+        n = min(int(n), self.capacity)
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.size >= n or self.closed, timeout):
+                return None
+            n = min(n, self.size)
+            idx = (self.start + np.arange(n)) % self.capacity
+            out = self.data[idx]
+            self.start = (self.start + n) % self.capacity
+            self.size -= n
+        return out
+
+    def depth(self):
+        """
+        Number of samples waiting to be read.
+        """
+        with self.cond:
+            return self.size
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+
+class MicCapture:
+    """
+    Callback-driven microphone capture feeding a RingBuffer.
+    PortAudio calls the callback on its own thread, so capture keeps running
+    while the consumer is busy with inference.
+
+    Channels are mixed to mono unless mix is False; then the buffer holds
+    interleaved frames and read() returns (n, channels) arrays.
+    """
+
+    def __init__(self, samplerate=16000, channels=1, blocksize=1600, buffer_seconds=30, device=None, mix=True):
+        self.samplerate = samplerate
+        self.channels = channels
+        self.blocksize = blocksize
+        self.device = device
+        self.mix = mix
+        self.width = 1 if mix else channels
+        self.buffer = RingBuffer(samplerate * buffer_seconds * self.width)
+        self.input_overflows = 0
+        self.stream = None
+
+    def callback(self, indata, frames, time, status):
+        if status.input_overflow:
+            self.input_overflows += 1
+        if not self.mix:
+            self.buffer.write(indata)
+        else:
+            self.buffer.write(indata[:, 0] if self.channels == 1 else indata.mean(axis=1))
+
+    def start(self):
+        self.stream = sd.InputStream(
+            samplerate=self.samplerate,
+            channels=self.channels,
+            blocksize=self.blocksize,
+            dtype="float32",
+            device=self.device,
+            callback=self.callback,
+        )
+        self.stream.start()
+
+    def stop(self):
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+        self.buffer.close()
+
+    def read(self, seconds, timeout=None):
+        audio = self.buffer.read(int(self.samplerate * seconds) * self.width, timeout)
+        if audio is None or self.mix:
+            return audio
+        return audio.reshape(-1, self.width)
+
+    def stats(self):
+        """
+        Queue depth in seconds plus drop counters, for reporting from the worker.
+        """
+        rate = self.samplerate * self.width
+        return {
+            "queue_seconds": self.buffer.depth() / rate,
+            "dropped_seconds": self.buffer.dropped / rate,
+            "overruns": self.buffer.overruns,
+            "input_overflows": self.input_overflows,
+        }
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class Resampler:
+    """
+    Streaming resampler for (n, channels) blocks, all channels at once.
+
+    A moving average over about one input period of the output rate removes
+    most content above the new Nyquist frequency, then samples are linearly
+    interpolated. Filter and phase state carry over between blocks, so
+    blocks of any size give a continuous signal. Plenty for speech at 16 kHz;
+    not meant for music.
+    """
+
+    def __init__(self, from_rate, to_rate, channels=1):
+        self.step = from_rate / to_rate
+        self.width = max(1, int(round(self.step))) if from_rate > to_rate else 1
+        self.history = np.zeros((self.width - 1, channels), dtype=np.float32)
+        self.previous = np.zeros((1, channels), dtype=np.float32)
+        self.position = 1.0
+
+    def __call__(self, block):
+        block = np.asarray(block, dtype=np.float32)
+        if self.step == 1.0:
+            return block
+        if self.width > 1:
+            padded = np.concatenate([self.history, block])
+            self.history = padded[len(padded) - (self.width - 1):]
+            sums = np.cumsum(padded, axis=0, dtype=np.float64)
+            sums[self.width:] = sums[self.width:] - sums[:-self.width]
+            block = (sums[self.width - 1:] / self.width).astype(np.float32)
+        # extended[0] is the last filtered sample of the previous block
+        extended = np.concatenate([self.previous, block])
+        self.previous = extended[-1:]
+        positions = np.arange(self.position, len(extended) - 1, self.step)
+        self.position = (positions[-1] + self.step if len(positions) else self.position) - len(block)
+        index = positions.astype(np.int64)
+        fraction = (positions - index)[:, None].astype(np.float32)
+        return extended[index] * (1 - fraction) + extended[index + 1] * fraction
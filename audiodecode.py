@@ -0,0 +1,153 @@
+import os
+import subprocess
+import tempfile
+import threading
+
+import numpy as np
+
+from vad import split_at_silence
+
+SAMPLE_RATE = 16000
+
+
+def ffmpeg_command(source, samplerate=SAMPLE_RATE):
+    """
+    ffmpeg arguments decoding source (a path, or "pipe:0" for stdin) to mono
+    s16le PCM at samplerate on stdout.
+    """
+    command = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-threads", "0"]
+    if source != "pipe:0":
+        command.append("-nostdin")
+    return command + ["-i", source, "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le",
+                      "-ar", str(samplerate), "-"]
+
+
+class PipeDecodeError(RuntimeError):
+    """
+    ffmpeg could not decode the input from a pipe.
+    """
+
+
+class StreamingDecoder:
+    """
+    Decode a file (path) or an in-memory upload (bytes) through ffmpeg and
+    yield windows of audio as they are decoded, cut at silence like
+    split_at_silence.
+
+    ffmpeg converts to 16 kHz mono s16le while decoding, and its stdout is
+    read straight into one preallocated buffer of a little over max_seconds.
+    Each window is emitted and the remainder is moved to the front of the
+    same buffer, so memory stays the same for a minute or a day of audio and
+    the first window is ready as soon as max_seconds have been decoded.
+    Windows are views into that buffer and are only valid until the next
+    one is requested.
+    """
+
+    def __init__(self, source, samplerate=SAMPLE_RATE, max_seconds=30.0, min_seconds=20.0):
+        self.source = source
+        self.samplerate = samplerate
+        self.max_seconds = max_seconds
+        self.min_seconds = min_seconds
+        self.total_bytes = len(source) if isinstance(source, (bytes, bytearray, memoryview)) else None
+        self.fed_bytes = 0
+        self.decoded_seconds = 0.0
+
+    def progress(self):
+        """
+        Fraction of an in-memory input handed to ffmpeg so far, else None.
+        """
+        if not self.total_bytes:
+            return None
+        return self.fed_bytes / self.total_bytes
+
+    def feed(self, stdin, data, chunk=1 << 16):
+        try:
+            view = memoryview(data)
+            for start in range(0, len(view), chunk):
+                stdin.write(view[start:start + chunk])
+                self.fed_bytes = min(len(view), start + chunk)
+        except (BrokenPipeError, OSError):
+            pass
+        finally:
+            try:
+                stdin.close()
+            except OSError:
+                pass
+
+    def windows(self):
+        """
+        Yield (start_seconds, float32 window) pairs until the input ends.
+        """
+        if self.total_bytes is None:
+            yield from self.read(subprocess.Popen(ffmpeg_command(self.source, self.samplerate),
+                                                  stdout=subprocess.PIPE, stderr=subprocess.PIPE))
+            return
+
+        process = subprocess.Popen(ffmpeg_command("pipe:0", self.samplerate), stdin=subprocess.PIPE,
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        writer = threading.Thread(target=self.feed, args=(process.stdin, self.source), daemon=True)
+        writer.start()
+        emitted = False
+        try:
+            for window in self.read(process, allow_fallback=True):
+                emitted = True
+                yield window
+        except PipeDecodeError:
+            pass
+        finally:
+            writer.join()
+        if not emitted:
+            # Inputs that need seeking (MP4/M4A with a trailing index)
+            fd, path = tempfile.mkstemp(prefix="upload_")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(self.source)
+                self.fed_bytes = self.total_bytes
+                yield from StreamingDecoder(path, self.samplerate, self.max_seconds, self.min_seconds).windows()
+            finally:
+                os.remove(path)
+
+    def read(self, process, allow_fallback=False):
+        max_samples = int(self.max_seconds * self.samplerate)
+        # Headroom past max_seconds so a full buffer always has a silence cut in range
+        raw = np.empty(2 * (max_samples + self.samplerate), dtype=np.uint8)
+        pcm = raw.view(np.int16)
+        audio = np.empty(len(pcm), dtype=np.float32)
+        view = memoryview(raw)
+        filled = 0
+        offset = 0
+        eof = False
+        try:
+            while True:
+                while not eof and filled < len(raw):
+                    n = process.stdout.readinto(view[filled:])
+                    if not n:
+                        eof = True
+                    filled += n or 0
+                samples = filled // 2
+                if samples == 0:
+                    break
+                np.multiply(pcm[:samples], 1 / 32768.0, out=audio[:samples], casting="unsafe")
+                windows = split_at_silence(audio[:samples], self.samplerate, self.max_seconds, self.min_seconds)
+                # Until the input ends, only the first window is complete
+                for start, end in windows if eof else windows[:1]:
+                    yield (offset + start) / self.samplerate, audio[start:end]
+                cut = end
+                offset += cut
+                self.decoded_seconds = offset / self.samplerate
+                rest = filled - 2 * cut
+                raw[:rest] = raw[2 * cut:filled].copy()
+                filled = rest
+                if eof and filled < 2:
+                    break
+        finally:
+            if not eof:
+                process.kill()
+            process.stdout.close()
+            stderr = process.stderr.read().decode(errors="replace")
+            returncode = process.wait()
+        if returncode != 0:
+            if allow_fallback and offset == 0:
+                raise PipeDecodeError(stderr)
+            raise RuntimeError(f"Failed to decode audio: {stderr}")
+
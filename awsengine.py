@@ -0,0 +1,121 @@
+import asyncio
+import threading
+
+import boto3
+
+from awsjobs import TranscribeJobs
+from awsstreaming import ResilientTranscriber
+from engines import TranscriptionEngine
+from pcmencode import PcmEncoder
+
+
+class AwsBatchEngine(TranscriptionEngine):
+    """
+    AWS Transcribe batch jobs. submit() keeps several jobs in flight and
+    delivers results in order; transcribe() runs one job synchronously.
+    diarize asks AWS for speaker labels (up to max_speakers).
+    """
+
+    name = "aws"
+
+    def __init__(self, language="en-US", region="eu-north-1", bucket="text2speechqt",
+                 max_in_flight=4, cache=True, diarize=False, max_speakers=4):
+        super().__init__(language, cache)
+        self.speaker_labels = diarize
+        self.max_speakers = max_speakers
+        self.region = region
+        self.bucket_name = bucket
+        self.max_in_flight = max_in_flight
+        self.encoder = PcmEncoder()
+        self.jobs = None
+        # Created in prepare() unless set beforehand (e.g. stand-ins for offline runs)
+        self.client = None
+        self.s3_client = None
+        self.session = None
+
+    def cache_key(self):
+        return "aws-transcribe/speakers" if self.speaker_labels else "aws-transcribe"
+
+    def prepare(self):
+        if self.client is None:
+            self.client = boto3.client("transcribe", region_name=self.region)
+            self.s3_client = boto3.client("s3", region_name=self.region)
+        if self.jobs is None:
+            self.jobs = TranscribeJobs(
+                self.client,
+                self.s3_client,
+                self.bucket_name,
+                on_result=None,
+                language_code=self.language,
+                max_in_flight=self.max_in_flight,
+                failure={"text": "Transcription failed. Check logs for details.", "error": True},
+                max_speakers=self.max_speakers if self.speaker_labels else None,
+                session=self.session,
+            )
+
+    def decode(self, audio, behind=False):
+        self.prepare()
+        return self.jobs.transcribe_result(bytes(self.encoder.wav_bytes(audio)))
+
+    def submit(self, audio, on_result, behind=False):
+        self.prepare()
+        # Encode now, on the capture thread; the job only uploads and polls.
+        wav_bytes = bytes(self.encoder.wav_bytes(audio))
+
+        def job():
+            if self.cache is None:
+                return self.jobs.transcribe_result(wav_bytes)
+            return self.cache.cached(audio, self.cache_key(), lambda: self.jobs.transcribe_result(wav_bytes),
+                                     language=self.language)
+
+        self.jobs.submit(job, on_result=lambda result: on_result(dict(result, final=True)))
+
+    def flush(self):
+        # Let the jobs already in flight finish and emit
+        if self.jobs is not None:
+            self.jobs.shutdown(wait=True)
+            self.jobs = None
+
+    def stats(self):
+        stats = super().stats()
+        stats["in_flight"] = self.jobs.in_flight() if self.jobs else 0
+        return stats
+
+
+class AwsStreamingEngine(TranscriptionEngine):
+    """
+    AWS Transcribe streaming through a ResilientTranscriber fed from the
+    shared capture, so it reconnects and replays on network errors. diarize
+    turns on AWS speaker labels.
+    """
+
+    name = "aws-stream"
+    streaming = True
+
+    def __init__(self, language="en-US", region="us-east-1", samplerate=16000, diarize=False):
+        super().__init__(language)
+        self.speaker_labels = diarize
+        self.region = region
+        self.samplerate = samplerate
+        self.encoder = PcmEncoder()
+        self.transcriber = None
+        self.thread = None
+
+    def start_stream(self, on_result):
+        self.transcriber = ResilientTranscriber(self.language, on_result, region=self.region,
+                                                samplerate=self.samplerate,
+                                                show_speaker_label=self.speaker_labels)
+        self.thread = threading.Thread(target=asyncio.run, args=(self.transcriber.run(capture=False),),
+                                       daemon=True)
+        self.thread.start()
+        self.transcriber.started.wait()
+
+    def feed(self, audio):
+        self.transcriber.feed(bytes(self.encoder.pcm_bytes(audio)))
+
+    def end_stream(self):
+        self.transcriber.stop()
+        self.thread.join()
+
+    def stats(self):
+        return self.transcriber.stats() if self.transcriber else {}
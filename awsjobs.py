@@ -0,0 +1,187 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from diarization import split_by_speaker
+from metrics import metrics
+
+
+class TranscribeJobs:
+    """
+    Runs several AWS Transcribe batch jobs at once and emits their results in
+    the order they were submitted.
+
+    Each job uploads its WAV to S3, starts a transcription job and polls it
+    with exponential backoff. Transcript JSON is fetched over one pooled HTTP
+    session. Submitting blocks once max_pending jobs are queued, so a stalled
+    service pushes back on capture instead of growing memory without bound.
+    A job that raises emits failure in its place. With max_speakers, jobs
+    ask for speaker labels and results are split into speaker turns.
+    """
+
+    def __init__(self, client, s3_client, bucket_name, on_result, language_code="en-US",
+                 max_in_flight=4, max_pending=16, poll_initial=0.5, poll_max=5.0, timeout=300.0,
+                 failure="Transcription failed. Check logs for details.", max_speakers=None, session=None):
+        self.client = client
+        self.s3_client = s3_client
+        self.bucket_name = bucket_name
+        self.on_result = on_result
+        self.failure = failure
+        self.max_speakers = max_speakers
+        self.language_code = language_code
+        self.poll_initial = poll_initial
+        self.poll_max = poll_max
+        self.timeout = timeout
+
+        self.pool = ThreadPoolExecutor(max_workers=max_in_flight)
+        self.slots = threading.Semaphore(max_pending)
+        self.session = session
+        if session is None:
+            self.session = requests.Session()
+            self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=max_in_flight))
+
+        self.lock = threading.Lock()
+        self.next_seq = 0
+        self.next_emit = 0
+        self.finished = {}
+        self.callbacks = {}
+        self.emitting = False
+
+    def submit(self, job, on_result=None):
+        """
+        Queue job (a callable returning the transcript) and return its
+        sequence number. on_result, if given, replaces the default callback
+        for this job only.
+        """
+        self.slots.acquire()
+        with self.lock:
+            seq = self.next_seq
+            self.next_seq += 1
+            self.callbacks[seq] = on_result or self.on_result
+        self.pool.submit(self.run_job, seq, job)
+        return seq
+
+    def run_job(self, seq, job):
+        try:
+            result = job()
+        except Exception as e:
+            print(f"Error during AWS Transcribe job {seq}: {e}")
+            result = self.failure
+        finally:
+            self.slots.release()
+
+        # Hold results that finish early until everything before them is out.
+        # One thread at a time emits, outside the lock, so callbacks stay in
+        # order and may call back into submit() or in_flight().
+        with self.lock:
+            self.finished[seq] = result
+            if self.emitting:
+                return
+            self.emitting = True
+        while True:
+            with self.lock:
+                ready = []
+                while self.next_emit in self.finished:
+                    ready.append((self.callbacks.pop(self.next_emit), self.finished.pop(self.next_emit)))
+                    self.next_emit += 1
+                if not ready:
+                    self.emitting = False
+                    return
+            for on_result, result in ready:
+                try:
+                    on_result(result)
+                except Exception as e:
+                    print(f"Error in AWS Transcribe result callback: {e}")
+
+    def in_flight(self):
+        with self.lock:
+            return self.next_seq - self.next_emit
+
+    def transcribe(self, wav_bytes):
+        """
+        Upload one WAV, run a transcription job on it and return the text.
+        """
+        return self.transcribe_result(wav_bytes)["text"]
+
+    def transcribe_result(self, wav_bytes):
+        """
+        Like transcribe(), but return a result dict with word timings.
+        """
+        with metrics.span("rpc"):
+            return self.run_transcription(wav_bytes)
+
+    def run_transcription(self, wav_bytes):
+        s3_key = f"chunk_{uuid.uuid4().hex}.wav"
+        self.s3_client.put_object(Bucket=self.bucket_name, Key=s3_key, Body=wav_bytes, ContentType="audio/wav")
+
+        job_name = f"transcription_job_{int(time.time())}_{uuid.uuid4().hex[:8]}"
+        settings = {}
+        if self.max_speakers:
+            settings = {"Settings": {"ShowSpeakerLabels": True, "MaxSpeakerLabels": self.max_speakers}}
+        self.client.start_transcription_job(
+            TranscriptionJobName=job_name,
+            Media={"MediaFileUri": f"s3://{self.bucket_name}/{s3_key}"},
+            MediaFormat="wav",
+            LanguageCode=self.language_code,
+            **settings,
+        )
+
+        delay = self.poll_initial
+        deadline = time.monotonic() + self.timeout
+        while True:
+            response = self.client.get_transcription_job(TranscriptionJobName=job_name)
+            status = response["TranscriptionJob"]["TranscriptionJobStatus"]
+            if status == "COMPLETED":
+                break
+            if status == "FAILED":
+                raise RuntimeError(f"AWS Transcribe job {job_name} failed")
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"AWS Transcribe job {job_name} timed out")
+            time.sleep(delay)
+            delay = min(delay * 2, self.poll_max)
+
+        transcript_uri = response["TranscriptionJob"]["Transcript"]["TranscriptFileUri"]
+        transcript_response = self.session.get(transcript_uri, timeout=30)
+        transcript_response.raise_for_status()
+        return parse_transcript(transcript_response.json())
+
+    def shutdown(self, wait=True):
+        self.pool.shutdown(wait=wait)
+        self.session.close()
+
+
+def parse_transcript(transcript):
+    """
+    Turn AWS Transcribe's transcript JSON into a result dict with its words.
+    Punctuation is attached to the preceding word. With speaker labels there
+    is one segment per speaker turn, otherwise a single segment.
+    """
+    results = transcript["results"]
+    text = results["transcripts"][0]["transcript"]
+    # Older transcripts only list speakers under speaker_labels, keyed by start time
+    speakers = {}
+    for turn in results.get("speaker_labels", {}).get("segments", []):
+        for item in turn["items"]:
+            speakers[item["start_time"]] = item["speaker_label"]
+    words = []
+    for item in results.get("items", []):
+        content = item["alternatives"][0]["content"]
+        if item["type"] == "punctuation":
+            if words:
+                words[-1]["word"] += content
+            continue
+        word = {"word": " " + content, "start": float(item["start_time"]), "end": float(item["end_time"])}
+        speaker = item.get("speaker_label") or speakers.get(item["start_time"])
+        if speaker is not None:
+            word["speaker"] = speaker
+        words.append(word)
+    if not words:
+        return {"text": text}
+    result = {"text": text, "segments": split_by_speaker(words, text)}
+    if "speaker" in words[0]:
+        result["speaker"] = words[0]["speaker"]
+    return result
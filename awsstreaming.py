@@ -0,0 +1,218 @@
+import asyncio
+import contextlib
+import threading
+from collections import deque
+
+import sounddevice as sd
+from amazon_transcribe.client import TranscribeStreamingClient
+from amazon_transcribe.handlers import TranscriptResultStreamHandler
+from amazon_transcribe.model import TranscriptEvent
+
+from diarization import split_by_speaker
+
+
+class AudioQueue:
+    """
+    Bounded queue between the PortAudio callback thread and the event loop.
+    When the loop falls behind, the oldest block is dropped and counted
+    instead of letting the queue grow without limit.
+    """
+
+    def __init__(self, loop, maxsize=200):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def put_threadsafe(self, item):
+        self.loop.call_soon_threadsafe(self.put, item)
+
+    def put(self, item):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(item)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def depth(self):
+        return self.queue.qsize()
+
+
+class TranscriptHandler(TranscriptResultStreamHandler):
+    def __init__(self, output_stream, transcriber):
+        super().__init__(output_stream)
+        self.transcriber = transcriber
+
+    async def handle_transcript_event(self, transcript_event: TranscriptEvent):
+        for result in transcript_event.transcript.results:
+            self.transcriber.handle_result(result)
+
+
+class ResilientTranscriber:
+    """
+    AWS Transcribe streaming session that survives network errors.
+
+    Microphone blocks go through a bounded AudioQueue. Every block sent is
+    kept until a final result covers it; if the session fails, a new one is
+    opened (with exponential backoff) and the unacknowledged audio is replayed
+    first, so nothing said during a blip is lost. stop() ends the stream
+    cleanly from any thread.
+
+    on_result is called with result dicts ("text", "final", and session-time
+    "start", "end" and "segments" with words). With capture=False in
+    run(), audio comes from feed() instead of the microphone.
+    """
+
+    def __init__(self, language_code, on_result, region="us-east-1", samplerate=16000,
+                 blocksize=1024 * 2, max_queue=200, max_unacked_seconds=30.0, max_backoff=30.0,
+                 show_speaker_label=False):
+        self.language_code = language_code
+        self.show_speaker_label = show_speaker_label
+        self.on_result = on_result
+        self.region = region
+        self.samplerate = samplerate
+        self.blocksize = blocksize
+        self.max_queue = max_queue
+        self.max_backoff = max_backoff
+        self.max_unacked_seconds = max_unacked_seconds
+        self.unacked = deque()
+        self.unacked_seconds = 0.0
+        self.running = False
+        self.loop = None
+        self.audio = None
+        self.sent_seconds = 0.0
+        self.stream_offset = 0.0
+        self.reconnects = 0
+        self.started = threading.Event()
+
+    def handle_result(self, result):
+        offset = self.stream_offset
+        for alt in result.alternatives[:1]:
+            words = []
+            for item in alt.items or []:
+                if item.item_type == "punctuation":
+                    if words:
+                        words[-1]["word"] += item.content
+                    continue
+                word = {"word": " " + item.content, "start": offset + item.start_time,
+                        "end": offset + item.end_time}
+                if getattr(item, "speaker", None) is not None:
+                    word["speaker"] = f"spk_{item.speaker}"
+                words.append(word)
+            start, end = offset + result.start_time, offset + result.end_time
+            out = {"text": alt.transcript, "final": not result.is_partial, "start": start, "end": end}
+            if words and "speaker" in words[0]:
+                out["speaker"] = words[0]["speaker"]
+                out["segments"] = split_by_speaker(words, alt.transcript)
+            else:
+                out["segments"] = [{"start": start, "end": end, "text": alt.transcript, "words": words}]
+            self.on_result(out)
+        if not result.is_partial:
+            # Everything up to the end of a final result is acknowledged.
+            acked = self.stream_offset + result.end_time
+            while self.unacked and self.unacked[0][0] + self.block_seconds(self.unacked[0][1]) <= acked:
+                self.pop_unacked()
+
+    def block_seconds(self, chunk):
+        return len(chunk) / 2 / self.samplerate
+
+    def pop_unacked(self):
+        _, chunk = self.unacked.popleft()
+        self.unacked_seconds -= self.block_seconds(chunk)
+
+    async def write_chunks(self, stream):
+        for _, chunk in list(self.unacked):
+            await stream.input_stream.send_audio_event(audio_chunk=chunk)
+        while self.running:
+            chunk = await self.audio.get()
+            if chunk is None:
+                break
+            self.unacked.append((self.sent_seconds, chunk))
+            self.unacked_seconds += self.block_seconds(chunk)
+            self.sent_seconds += self.block_seconds(chunk)
+            # Bounded by audio time, whatever size the chunks are
+            while self.unacked_seconds > self.max_unacked_seconds:
+                self.pop_unacked()
+            await stream.input_stream.send_audio_event(audio_chunk=chunk)
+        await stream.input_stream.end_stream()
+
+    async def session(self):
+        client = TranscribeStreamingClient(region=self.region)
+        stream = await client.start_stream_transcription(
+            language_code=self.language_code,
+            media_sample_rate_hz=self.samplerate,
+            media_encoding="pcm",
+            show_speaker_label=self.show_speaker_label,
+        )
+        # The new stream's time zero is the first block we are about to replay.
+        self.stream_offset = self.unacked[0][0] if self.unacked else self.sent_seconds
+        handler = TranscriptHandler(stream.output_stream, self)
+
+        tasks = [asyncio.ensure_future(self.write_chunks(stream)),
+                 asyncio.ensure_future(handler.handle_events())]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                task.result()
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def feed(self, chunk):
+        """
+        Queue one block of int16 PCM bytes from any thread.
+        """
+        self.audio.put_threadsafe(chunk)
+
+    async def run(self, capture=True):
+        self.running = True
+        self.loop = asyncio.get_running_loop()
+        self.audio = AudioQueue(self.loop, self.max_queue)
+        self.started.set()
+
+        def callback(indata, frame_count, time_info, status):
+            self.audio.put_threadsafe(bytes(indata))
+
+        stream = contextlib.nullcontext()
+        if capture:
+            stream = sd.RawInputStream(
+                channels=1,
+                samplerate=self.samplerate,
+                callback=callback,
+                blocksize=self.blocksize,
+                dtype="int16",
+            )
+
+        with stream:
+            delay = 1.0
+            while self.running:
+                try:
+                    await self.session()
+                    delay = 1.0
+                except Exception as e:
+                    if not self.running:
+                        break
+                    self.reconnects += 1
+                    print(f"Streaming session failed ({e}); reconnecting in {delay:.0f}s, "
+                          f"replaying {self.unacked_seconds:.1f}s of audio")
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, self.max_backoff)
+        print(f"Session ended: {self.stats()}")
+
+    def stop(self):
+        """
+        Stop from any thread: wake the writer so it ends the stream.
+        """
+        self.running = False
+        if self.audio is not None and not self.loop.is_closed():
+            self.audio.put_threadsafe(None)
+
+    def stats(self):
+        return {
+            "dropped_blocks": self.audio.dropped if self.audio else 0,
+            "queue_depth": self.audio.depth() if self.audio else 0,
+            "reconnects": self.reconnects,
+            "sent_seconds": self.sent_seconds,
+        }
@@ -0,0 +1,172 @@
+import argparse
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from audiodecode import StreamingDecoder
+from diarization import Diarizer
+from subtitles import write_result
+from transcriptcache import TranscriptCache
+
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".m4a", ".ogg", ".flac", ".webm", ".mp4")
+
+# One model (and cache handle) per worker process, set up by init_worker
+worker_model = None
+worker_cache = None
+worker_model_key = None
+
+
+def find_audio(inputs):
+    """
+    Expand directories (recursively) and glob patterns into audio file paths.
+    """
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, files in os.walk(item):
+                paths.extend(os.path.join(root, f) for f in files if f.lower().endswith(AUDIO_EXTENSIONS))
+        else:
+            paths.extend(glob.glob(item, recursive=True))
+    return sorted(set(paths))
+
+
+def file_key(path):
+    stat = os.stat(path)
+    return {"path": os.path.abspath(path), "size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def load_manifest(path):
+    """
+    Completed entries from a JSON-lines manifest, keyed by absolute path.
+    """
+    done = {}
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    entry = json.loads(line)
+                    done[entry["path"]] = entry
+    return done
+
+
+def is_done(path, done, fmt):
+    """
+    True if the manifest has this exact file (same size and mtime) in fmt.
+    """
+    entry = done.get(os.path.abspath(path))
+    key = file_key(path)
+    return (entry is not None and entry["size"] == key["size"] and entry["mtime"] == key["mtime"]
+            and entry.get("format") == fmt)
+
+
+def init_worker(model_name, backend, threads, cache_dir=None, use_cache=True):
+    global worker_model, worker_cache, worker_model_key
+    import torch
+    from whisperbackends import load_model
+
+    # Pin intra-op threads so workers don't oversubscribe the CPU.
+    torch.set_num_threads(threads)
+    worker_model = load_model(model_name, backend)
+    worker_model_key = f"{model_name}/{backend}"
+    worker_cache = TranscriptCache(cache_dir) if use_cache else None
+
+
+def transcribe_file(path, language=None, samplerate=16000, diarize=False):
+    """
+    Transcribe one file in ≤30 s windows cut at silence and merge the results
+    with timestamps relative to the start of the file. With diarize, each
+    segment gets a speaker from online clustering over the file.
+
+    The file is decoded as it is transcribed, so worker memory does not
+    grow with file length.
+    """
+    diarizer = Diarizer() if diarize else None
+    decoder = StreamingDecoder(path, samplerate)
+    start_time = time.perf_counter()
+    texts, segments = [], []
+    hits = worker_cache.hits if worker_cache else 0
+    for offset, window in decoder.windows():
+        decode = lambda: worker_model.transcribe(window, fp16=False, language=language,
+                                                 condition_on_previous_text=False)
+        if worker_cache:
+            result = worker_cache.cached(window, worker_model_key, decode, language,
+                                         condition_on_previous_text=False)
+        else:
+            result = decode()
+        language = language or result.get("language")
+        texts.append(result["text"].strip())
+        if diarizer is not None:
+            diarizer.label_result(result, window)
+        for segment in result["segments"]:
+            segments.append({"start": segment["start"] + offset, "end": segment["end"] + offset,
+                             "text": segment["text"]})
+            if diarizer is not None:
+                segments[-1]["speaker"] = segment["speaker"]
+    return {
+        "text": " ".join(t for t in texts if t),
+        "segments": segments,
+        "language": language,
+        "duration": decoder.decoded_seconds,
+        "elapsed": time.perf_counter() - start_time,
+        "cache_hits": (worker_cache.hits - hits) if worker_cache else 0,
+    }
+
+
+def output_path(path, output_dir, fmt):
+    name = os.path.splitext(os.path.basename(path))[0] + "." + fmt
+    return os.path.join(output_dir or os.path.dirname(path), name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transcribe many audio files with Whisper.")
+    parser.add_argument("inputs", nargs="+", help="Audio files, directories or glob patterns")
+    parser.add_argument("--model", default="base")
+    parser.add_argument("--backend", default="torch", choices=["torch", "int8", "ctranslate2"])
+    parser.add_argument("--language", default=None)
+    parser.add_argument("--format", default="txt", choices=["txt", "srt", "vtt", "json"])
+    parser.add_argument("--output-dir", default=None, help="Defaults to next to each input")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--threads", type=int, default=2, help="Torch threads per worker")
+    parser.add_argument("--cache-dir", default=None, help="Transcript cache (default: TRANSCRIPT_CACHE_DIR or ~/.cache)")
+    parser.add_argument("--no-cache", action="store_true", help="Always decode, never read or write the cache")
+    parser.add_argument("--diarize", action="store_true", help="Label speakers in the output")
+    parser.add_argument("--manifest", default="transcribe_manifest.jsonl",
+                        help="Records finished files so an interrupted run can resume")
+    args = parser.parse_args()
+
+    paths = find_audio(args.inputs)
+    done = load_manifest(args.manifest)
+    todo = [p for p in paths if not is_done(p, done, args.format)]
+    print(f"{len(paths)} files, {len(paths) - len(todo)} already done, {len(todo)} to transcribe")
+    if not todo:
+        return
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker,
+                             initargs=(args.model, args.backend, args.threads,
+                                       args.cache_dir, not args.no_cache)) as pool, \
+            open(args.manifest, "a", encoding="utf-8") as manifest:
+        futures = {pool.submit(transcribe_file, path, args.language, diarize=args.diarize): path
+                   for path in todo}
+        for i, future in enumerate(as_completed(futures), 1):
+            path = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"[{i}/{len(todo)}] Error transcribing {path}: {e}")
+                continue
+            out = output_path(path, args.output_dir, args.format)
+            write_result(result, out, args.format)
+            manifest.write(json.dumps({**file_key(path), "format": args.format, "output": out}) + "\n")
+            manifest.flush()
+            print(f"[{i}/{len(todo)}] {path} -> {out} "
+                  f"({result['duration'] / max(result['elapsed'], 1e-6):.1f}x real time, "
+                  f"{result['cache_hits']} cached windows)")
+
+
+if __name__ == "__main__":
+    main()
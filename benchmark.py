@@ -0,0 +1,304 @@
+import argparse
+import json
+import os
+import platform
+import re
+import sys
+import threading
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+
+import audiocapture
+from engines import create_engine
+from metrics import metrics
+from pipeline import TranscriptionPipeline
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SAMPLE_RATE = 16000
+
+# Metrics stages where an engine does its work: local inference and the
+# round trips of cloud or whisperserver requests
+PROCESSING_STAGES = ("language_id", "encode", "decode", "rpc")
+
+
+def load_wav(path, samplerate=SAMPLE_RATE):
+    """
+    Read a PCM WAV as mono float32, resampled linearly to samplerate.
+    """
+    with wave.open(path, "rb") as f:
+        if f.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit PCM WAV fixtures are supported")
+        rate, channels = f.getframerate(), f.getnchannels()
+        audio = np.frombuffer(f.readframes(f.getnframes()), np.int16).astype(np.float32) / 32768.0
+    audio = audio.reshape(-1, channels).mean(axis=1)
+    if rate != samplerate:
+        positions = np.arange(int(len(audio) * samplerate / rate)) * rate / samplerate
+        audio = np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+    return audio
+
+
+def load_reference(path):
+    """
+    Reference transcript next to the fixture (same name, .txt), if any.
+    """
+    reference = os.path.splitext(path)[0] + ".txt"
+    if not os.path.exists(reference):
+        return None
+    with open(reference, encoding="utf-8") as f:
+        return f.read()
+
+
+def normalize(text):
+    return re.sub(r"[^\w\s']", " ", text.lower()).split()
+
+
+def word_error_rate(reference, hypothesis):
+    """
+    Word-level Levenshtein distance over the reference length, after
+    lower-casing and stripping punctuation.
+    """
+    ref, hyp = normalize(reference), normalize(hypothesis)
+    if not ref:
+        return float(bool(hyp))
+    row = np.arange(len(hyp) + 1)
+    for i, word in enumerate(ref, 1):
+        previous, row = row, np.empty_like(row)
+        row[0] = i
+        for j, other in enumerate(hyp, 1):
+            row[j] = min(previous[j] + 1, row[j - 1] + 1, previous[j - 1] + (word != other))
+    return row[-1] / len(ref)
+
+
+class ReplayInputStream:
+    """
+    Stand-in for sounddevice.InputStream that plays a float32 array into the
+    callback at speed times real time, followed by tail_seconds of silence so
+    the last utterance is closed by the VAD.
+    """
+
+    def __init__(self, audio, speed=1.0, tail_seconds=2.0, samplerate=SAMPLE_RATE, channels=1,
+                 blocksize=1600, callback=None, **kwargs):
+        silence = np.zeros(int(tail_seconds * samplerate), dtype=np.float32)
+        self.audio = np.concatenate([audio, silence])
+        self.speed = speed
+        self.samplerate = samplerate
+        self.channels = channels
+        self.blocksize = blocksize
+        self.callback = callback
+        self.finished = threading.Event()
+        self.stopped = threading.Event()
+        self.started_at = None
+        self.thread = None
+
+    def start(self):
+        self.started_at = time.monotonic()
+        self.thread = threading.Thread(target=self.play, daemon=True)
+        self.thread.start()
+
+    def play(self):
+        status = SimpleNamespace(input_overflow=False)
+        for start in range(0, len(self.audio), self.blocksize):
+            if self.stopped.is_set():
+                break
+            block = self.audio[start:start + self.blocksize]
+            self.callback(np.repeat(block[:, None], self.channels, axis=1), len(block), None, status)
+            delay = self.started_at + (start + len(block)) / self.samplerate / self.speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        self.finished.set()
+
+    def stop(self):
+        self.stopped.set()
+
+    def close(self):
+        pass
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else None
+
+
+def disable_cache(engine):
+    """
+    Time the backends rather than TranscriptCache, and keep offline mock
+    answers out of the shared cache.
+    """
+    engine.cache = None
+    if engine.name == "router":
+        for backend in [engine.local, *engine.cloud]:
+            disable_cache(backend)
+
+
+def run_case(config, fixture, speed, offline, cloud_latency=None):
+    """
+    Replay one fixture through one engine in this process and measure it.
+    Meant to run in a fresh worker process so peak RSS is per case.
+    """
+    audio = load_wav(fixture)
+    audio_seconds = len(audio) / SAMPLE_RATE
+    engine = create_engine(config)
+    disable_cache(engine)
+    if offline:
+        from cloudmocks import install_mocks
+        if not install_mocks(engine, cloud_latency):
+            return {"skipped": f"{engine.name} has no offline mock"}
+
+    load_start = time.perf_counter()
+    engine.prepare()
+    # Local models warm up in the background; keep that out of the run
+    if "modelregistry" in sys.modules:
+        for shared in list(sys.modules["modelregistry"].registry.models.values()):
+            shared.ready.wait()
+    load_seconds = time.perf_counter() - load_start
+    metrics.enable()
+    metrics.reset()
+
+    streams = []
+
+    def input_stream(**kwargs):
+        streams.append(ReplayInputStream(audio, speed, **kwargs))
+        return streams[-1]
+
+    events, last_stats = [], {}
+
+    def on_result(result):
+        events.append((time.monotonic(), result))
+
+    pipeline = TranscriptionPipeline(engine)
+    cpu_start = time.process_time()
+    with mock.patch.object(audiocapture, "sd", SimpleNamespace(InputStream=input_stream)):
+        thread = threading.Thread(target=pipeline.run, args=(on_result, last_stats.update))
+        thread.start()
+        while not streams:
+            time.sleep(0.01)
+        streams[0].finished.wait()
+        pipeline.stop()
+        thread.join()
+    finished = time.monotonic()
+    cpu_seconds = time.process_time() - cpu_start
+    started = streams[0].started_at
+    wall = finished - started
+    # The replay includes the trailing silence, so time it against that too
+    replay_seconds = len(streams[0].audio) / SAMPLE_RATE
+    spans = metrics.snapshot()["spans"]
+    processing = [spans[stage]["total_seconds"] for stage in PROCESSING_STAGES if stage in spans]
+
+    # When the audio a result refers to was played into the capture
+    played = lambda seconds: started + seconds / speed
+    timed = [(arrived, r) for arrived, r in events if "start" in r and not r.get("error")]
+    first_partial = min((arrived - played(r["start"]) for arrived, r in timed), default=None)
+    finalization = [arrived - played(r["end"]) for arrived, r in timed if r.get("final", True)]
+
+    text = " ".join(r["text"].strip() for _, r in events if r.get("final", True) and not r.get("error"))
+    reference = load_reference(fixture)
+    return {
+        "audio_seconds": audio_seconds,
+        "load_seconds": load_seconds,
+        "wall_seconds": wall,
+        # Engine processing time per second of audio. None for cloud streaming
+        # engines, whose work happens server-side within one long stream.
+        "processing_seconds": sum(processing) if processing else None,
+        "rtf": sum(processing) / audio_seconds if processing else None,
+        # Wall clock over the replay; 1/speed is its floor, so it only shows falling behind
+        "wall_rtf": wall / replay_seconds,
+        "cpu_seconds": cpu_seconds,
+        "cpu_percent": 100 * cpu_seconds / wall if wall else None,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 if resource else None,
+        "first_partial_latency": first_partial,
+        "finalization_latency_mean": float(np.mean(finalization)) if finalization else None,
+        "finalization_latency_p50": percentile(finalization, 50),
+        "finalization_latency_p95": percentile(finalization, 95),
+        "results": len(events),
+        "errors": sum(1 for _, r in events if r.get("error")),
+        "dropped_seconds": last_stats.get("dropped_seconds", 0.0),
+        "wer": word_error_rate(reference, text) if reference is not None else None,
+        "text": text,
+    }
+
+
+def parse_engine(spec):
+    """
+    "whisper:base" -> {"engine": "whisper", "model": "base"}; a .json path is
+    read as a full engine config; anything else is an engine name.
+    """
+    if spec.endswith(".json"):
+        with open(spec, encoding="utf-8") as f:
+            return json.load(f)
+    name, _, model = spec.partition(":")
+    return {"engine": name, "model": model} if model else {"engine": name}
+
+
+def compare(runs, previous_path):
+    """
+    Print changes against an earlier results file for matching cases.
+    """
+    with open(previous_path, encoding="utf-8") as f:
+        previous = {(r["label"], r["fixture"]): r for r in json.load(f)["runs"]}
+    for run in runs:
+        before = previous.get((run["label"], run["fixture"]))
+        if before is None or "skipped" in run or "skipped" in before:
+            continue
+        changes = []
+        for key in ("rtf", "finalization_latency_p95", "peak_rss_mb", "wer"):
+            if run.get(key) is not None and before.get(key) is not None:
+                changes.append(f"{key} {before[key]:.3f} -> {run[key]:.3f}")
+        print(f"{run['label']} on {os.path.basename(run['fixture'])}: " + ", ".join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay WAV fixtures through transcription engines.")
+    parser.add_argument("fixtures", nargs="+", help="16-bit PCM WAV files; reference text in a .txt next to each")
+    parser.add_argument("--engine", action="append", dest="engines",
+                        help="Engine spec, e.g. whisper:tiny, whisper-stream:base, google, aws, or a JSON config "
+                             "(repeatable; default whisper:tiny and whisper:base)")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed (1 = real time)")
+    parser.add_argument("--offline", action="store_true", help="Replace cloud clients with local mocks")
+    parser.add_argument("--cloud-latency", type=float, default=None, help="Mock cloud response time in seconds")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", default=None, help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    runs = []
+    for spec in args.engines or ["whisper:tiny", "whisper:base"]:
+        for fixture in args.fixtures:
+            # A fresh process per case, so peak RSS and model caches don't leak between runs
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                try:
+                    run = pool.submit(run_case, parse_engine(spec), fixture, args.speed, args.offline,
+                                      args.cloud_latency).result()
+                except Exception as e:
+                    run = {"error": str(e)}
+            run.update(label=spec, fixture=fixture, speed=args.speed, offline=args.offline)
+            runs.append(run)
+            if "wall_rtf" in run:
+                wer = f"{run['wer']:.1%}" if run["wer"] is not None else "n/a"
+                rtf = f"{run['rtf']:.2f}" if run["rtf"] is not None else "n/a"
+                print(f"{spec} on {os.path.basename(fixture)}: RTF {rtf} (wall {run['wall_rtf']:.2f}), "
+                      f"final latency p95 {run['finalization_latency_p95'] or 0:.2f}s, "
+                      f"CPU {run['cpu_percent']:.0f}%, WER {wer}")
+            else:
+                print(f"{spec} on {os.path.basename(fixture)}: {run.get('skipped') or run.get('error')}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "runs": runs,
+        }, f, indent=2)
+    print(f"Wrote {args.output}")
+    if args.compare:
+        compare(runs, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import datetime
+import threading
+import time
+import uuid
+from types import SimpleNamespace
+
+MOCK_TEXT = "mock transcription"
+
+
+def timedelta(seconds):
+    return datetime.timedelta(seconds=seconds)
+
+
+def mock_words(text, start, end):
+    """
+    Spread the words of text evenly over start..end.
+    """
+    words = text.split()
+    step = (end - start) / max(1, len(words))
+    return [(w, start + i * step, start + (i + 1) * step) for i, w in enumerate(words)]
+
+
+class MockSpeechClient:
+    """
+    Stand-in for google.cloud.speech SpeechClient. recognize() answers after
+    latency seconds; streaming_recognize() sends an interim result every
+    interim_every seconds of audio and a final one every final_every.
+    """
+
+    def __init__(self, latency=0.5, text=MOCK_TEXT, interim_every=0.5, final_every=3.0):
+        self.latency = latency
+        self.text = text
+        self.interim_every = interim_every
+        self.final_every = final_every
+
+    def alternative(self, start, end, speaker_tag=1):
+        words = [SimpleNamespace(word=w, start_time=timedelta(s), end_time=timedelta(e), speaker_tag=speaker_tag)
+                 for w, s, e in mock_words(self.text, start, end)]
+        return SimpleNamespace(transcript=self.text, words=words)
+
+    def recognize(self, config, audio):
+        time.sleep(self.latency)
+        duration = len(audio.content) / 2 / config.sample_rate_hertz
+        result = SimpleNamespace(alternatives=[self.alternative(0.0, duration)])
+        return SimpleNamespace(results=[result])
+
+    def streaming_recognize(self, config, requests):
+        samplerate = config.config.sample_rate_hertz
+        sent = last_interim = last_final = 0.0
+        for request in requests:
+            sent += len(request.audio_content) / 2 / samplerate
+            if sent - last_final >= self.final_every:
+                time.sleep(self.latency)
+                result = SimpleNamespace(alternatives=[self.alternative(last_final, sent)], is_final=True,
+                                         result_end_time=timedelta(sent))
+                last_final = last_interim = sent
+                yield SimpleNamespace(results=[result])
+            elif sent - last_interim >= self.interim_every:
+                result = SimpleNamespace(alternatives=[SimpleNamespace(transcript=self.text, words=[])],
+                                         is_final=False, result_end_time=timedelta(sent))
+                last_interim = sent
+                yield SimpleNamespace(results=[result])
+
+
+class MockTranscribeService:
+    """
+    Stand-ins for the boto3 Transcribe and S3 clients and the HTTP session
+    TranscribeJobs uses. Jobs complete latency seconds after they start.
+    """
+
+    def __init__(self, latency=2.0, text=MOCK_TEXT):
+        self.latency = latency
+        self.text = text
+        self.objects = {}
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    # S3
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        with self.lock:
+            self.objects[f"s3://{Bucket}/{Key}"] = len(Body)
+
+    # Transcribe
+    def start_transcription_job(self, TranscriptionJobName, Media, MediaFormat, LanguageCode, **kwargs):
+        with self.lock:
+            size = self.objects.pop(Media["MediaFileUri"])
+            self.jobs[TranscriptionJobName] = (time.monotonic() + self.latency, (size - 44) / 2 / 16000)
+
+    def get_transcription_job(self, TranscriptionJobName):
+        ready_at, _ = self.jobs[TranscriptionJobName]
+        job = {"TranscriptionJobStatus": "COMPLETED" if time.monotonic() >= ready_at else "IN_PROGRESS",
+               "Transcript": {"TranscriptFileUri": f"https://mock/{TranscriptionJobName}/{uuid.uuid4().hex}"}}
+        return {"TranscriptionJob": job}
+
+    # requests.Session
+    def get(self, uri, timeout=None):
+        with self.lock:
+            _, duration = self.jobs.pop(uri.split("/")[3])
+        items = [{"type": "pronunciation", "start_time": str(s), "end_time": str(e), "alternatives": [{"content": w}]}
+                 for w, s, e in mock_words(self.text, 0.0, duration)]
+        transcript = {"results": {"transcripts": [{"transcript": self.text}], "items": items}}
+        return SimpleNamespace(raise_for_status=lambda: None, json=lambda: transcript)
+
+    def close(self):
+        pass
+
+
+def install_mocks(engine, latency=None):
+    """
+    Swap the cloud clients of engine (and of a router's backends) for local
+    stand-ins. Returns False if the engine has a cloud client that cannot be
+    mocked (AWS streaming).
+    """
+    if engine.name == "router":
+        return all([install_mocks(e, latency) for e in [engine.local, *engine.cloud]])
+    if engine.name in ("google", "google-stream"):
+        engine.client = MockSpeechClient(0.5 if latency is None else latency)
+    elif engine.name == "aws":
+        service = MockTranscribeService(2.0 if latency is None else latency)
+        engine.client = engine.s3_client = engine.session = service
+    elif engine.name == "aws-stream":
+        return False
+    return True
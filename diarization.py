@@ -0,0 +1,229 @@
+import threading
+from collections import deque
+
+import numpy as np
+
+
+def mel_filterbank(samplerate, n_fft, n_mels, fmin=60.0):
+    to_mel = lambda f: 2595 * np.log10(1 + f / 700)
+    to_hz = lambda m: 700 * (10 ** (m / 2595) - 1)
+    points = to_hz(np.linspace(to_mel(fmin), to_mel(samplerate / 2), n_mels + 2))
+    bins = np.floor((n_fft + 1) * points / samplerate).astype(int)
+    bank = np.zeros((n_mels, n_fft // 2 + 1), dtype=np.float32)
+    for i in range(n_mels):
+        left, center, right = bins[i], bins[i + 1], bins[i + 2]
+        if center > left:
+            bank[i, left:center] = (np.arange(left, center) - left) / (center - left)
+        if right > center:
+            bank[i, center:right] = (right - np.arange(center, right)) / (right - center)
+    return bank
+
+
+class MfccEmbedder:
+    """
+    Dependency-free speaker embedding: mean and spread of MFCCs over the
+    loudest frames of a segment. Much weaker than a neural embedding, but
+    enough to tell apart clearly different voices.
+    """
+
+    threshold = 0.9
+
+    def __init__(self, samplerate=16000, n_mels=40, n_mfcc=20):
+        self.samplerate = samplerate
+        self.n_fft = 512
+        self.win = int(0.025 * samplerate)
+        self.hop = int(0.010 * samplerate)
+        self.window = np.hamming(self.win).astype(np.float32)
+        self.bank = mel_filterbank(samplerate, self.n_fft, n_mels)
+        n = np.arange(n_mels)
+        self.dct = np.cos(np.pi * np.arange(1, n_mfcc)[:, None] * (n + 0.5) / n_mels).astype(np.float32)
+
+    def embed(self, audio):
+        audio = np.asarray(audio, dtype=np.float32)
+        if len(audio) < self.win:
+            return None
+        frames = np.lib.stride_tricks.sliding_window_view(audio, self.win)[::self.hop] * self.window
+        power = np.abs(np.fft.rfft(frames, self.n_fft)) ** 2
+        log_mel = np.log(power @ self.bank.T + 1e-10)
+        # Drop the quietest frames (pauses, breaths) before pooling
+        energy = log_mel.sum(axis=1)
+        mfcc = (log_mel @ self.dct.T)[energy >= np.percentile(energy, 30)]
+        return np.concatenate([mfcc.mean(axis=0), mfcc.std(axis=0)])
+
+
+class ResemblyzerEmbedder:
+    """
+    d-vector speaker embeddings from resemblyzer (optional dependency).
+    """
+
+    threshold = 0.75
+
+    def __init__(self, samplerate=16000):
+        from resemblyzer import VoiceEncoder
+        self.encoder = VoiceEncoder(verbose=False)
+        self.samplerate = samplerate
+
+    def embed(self, audio):
+        if len(audio) < self.samplerate // 2:
+            return None
+        return self.encoder.embed_utterance(np.asarray(audio, dtype=np.float32))
+
+
+def make_embedder(kind="auto", samplerate=16000):
+    """
+    "resemblyzer", "mfcc", or "auto" (resemblyzer when installed).
+    """
+    if kind in ("auto", "resemblyzer"):
+        try:
+            return ResemblyzerEmbedder(samplerate)
+        except ImportError:
+            if kind == "resemblyzer":
+                raise
+    return MfccEmbedder(samplerate)
+
+
+class OnlineClustering:
+    """
+    Incremental speaker clustering. Each embedding joins the most similar
+    centroid (cosine) if it is at least threshold, and that centroid moves
+    towards it; otherwise it starts a new speaker, up to max_speakers. Work per
+    segment depends only on the number of speakers, not session length.
+    """
+
+    def __init__(self, threshold=0.75, max_speakers=8):
+        self.threshold = threshold
+        self.max_speakers = max_speakers
+        self.centroids = []
+        self.counts = []
+
+    def assign(self, embedding):
+        embedding = embedding / (np.linalg.norm(embedding) + 1e-10)
+        if self.centroids:
+            centroids = np.stack(self.centroids)
+            similarity = centroids @ embedding / (np.linalg.norm(centroids, axis=1) + 1e-10)
+            best = int(np.argmax(similarity))
+            if similarity[best] >= self.threshold or len(self.centroids) >= self.max_speakers:
+                self.counts[best] += 1
+                self.centroids[best] += (embedding - self.centroids[best]) / self.counts[best]
+                return best
+        self.centroids.append(embedding.copy())
+        self.counts.append(1)
+        return len(self.centroids) - 1
+
+
+def set_speaker(result, speaker):
+    """
+    Label a result, its segments and words with one speaker.
+    """
+    result["speaker"] = speaker
+    for segment in result.get("segments") or []:
+        segment["speaker"] = speaker
+        for word in segment.get("words") or []:
+            word["speaker"] = speaker
+    return result
+
+
+def split_by_speaker(words, text=None):
+    """
+    Group words carrying a "speaker" into Whisper-style segments, one per
+    speaker turn.
+    """
+    segments = []
+    for word in words:
+        if segments and segments[-1]["speaker"] == word.get("speaker"):
+            segment = segments[-1]
+            segment["words"].append(word)
+            segment["end"] = word["end"]
+            segment["text"] += word["word"]
+        else:
+            segments.append({"start": word["start"], "end": word["end"], "text": word["word"],
+                             "speaker": word.get("speaker"), "words": [word]})
+    if len(segments) == 1 and text is not None:
+        segments[0]["text"] = text
+    return segments
+
+
+class Diarizer:
+    """
+    Local diarization for backends without speaker labels. VAD segments (or
+    the Whisper segments inside them) are embedded and clustered online, so
+    the labels are stable across a session and cost stays flat however long
+    it runs.
+
+    For streaming engines, speaker turns are remembered (a bounded window)
+    and results are labelled by the turn they overlap.
+    """
+
+    def __init__(self, embedder="auto", threshold=None, max_speakers=8, min_seconds=1.0,
+                 samplerate=16000, max_turns=256):
+        if isinstance(embedder, str):
+            embedder = make_embedder(embedder, samplerate)
+        self.embedder = embedder
+        self.clustering = OnlineClustering(threshold or embedder.threshold, max_speakers)
+        self.min_seconds = min_seconds
+        self.samplerate = samplerate
+        self.turns = deque(maxlen=max_turns)
+        self.last = None
+        self.lock = threading.Lock()
+
+    def label(self, audio):
+        """
+        Speaker label for one stretch of audio. Stretches too short to embed
+        reliably keep the previous speaker.
+        """
+        if len(audio) < self.min_seconds * self.samplerate:
+            return self.last
+        embedding = self.embedder.embed(audio)
+        if embedding is None:
+            return self.last
+        with self.lock:
+            self.last = f"spk_{self.clustering.assign(embedding)}"
+        return self.last
+
+    def label_result(self, result, audio, offset=0.0):
+        """
+        Label each segment of a result by its own slice of audio, which
+        starts at offset seconds on the result's clock. Segments too short to
+        embed fall back to the previous speaker; the whole audio is labelled
+        once, only if there is no previous speaker yet.
+        """
+        speaker = None
+        whole = False
+        for segment in result.get("segments") or []:
+            start = max(0, int((segment["start"] - offset) * self.samplerate))
+            end = int((segment["end"] - offset) * self.samplerate)
+            segment["speaker"] = self.label(audio[start:end])
+            if segment["speaker"] is None and not whole:
+                segment["speaker"], whole = self.label(audio), True
+            for word in segment.get("words") or []:
+                word["speaker"] = segment["speaker"]
+            speaker = speaker or segment["speaker"]
+        if speaker is None and not whole:
+            speaker = self.label(audio)
+        result["speaker"] = speaker
+        return result
+
+    def add_turn(self, start, audio):
+        """
+        Record a speech segment starting at start seconds (stream time).
+        """
+        speaker = self.label(audio)
+        if speaker is not None:
+            self.turns.append((start, start + len(audio) / self.samplerate, speaker))
+        return speaker
+
+    def speaker_at(self, start, end):
+        """
+        Speaker of the turn overlapping start..end most, else the latest one.
+        """
+        best, overlap = self.last, 0.0
+        for turn_start, turn_end, speaker in reversed(self.turns):
+            if turn_end < start:
+                break
+            shared = min(end, turn_end) - max(start, turn_start)
+            if shared > overlap:
+                best, overlap = speaker, shared
+        return best
+
+    def stats(self):
+        return {"speakers": len(self.clustering.centroids)}
@@ -0,0 +1,155 @@
+import asyncio
+import importlib
+import json
+
+# Engine name -> (module, class). Modules are imported on first use so each
+# backend's SDK is only needed when that backend is selected.
+ENGINES = {
+    "whisper": ("whisperengine", "WhisperEngine"),
+    "whisper-stream": ("whisperengine", "WhisperStreamingEngine"),
+    "google": ("googleengine", "GoogleEngine"),
+    "google-stream": ("googleengine", "GoogleStreamingEngine"),
+    "aws": ("awsengine", "AwsBatchEngine"),
+    "aws-stream": ("awsengine", "AwsStreamingEngine"),
+    "auto-stream": ("languageid", "AutoLanguageEngine"),
+    "router": ("router", "RouterEngine"),
+    "fake": ("fakeengine", "FakeEngine"),
+}
+
+
+class TranscriptionEngine:
+    """
+    Common interface for every transcription backend.
+
+    Batch engines implement decode(audio, behind) for one float32 16 kHz
+    segment and get transcribe() (with optional caching), atranscribe() and
+    submit() from here. behind is True while the pipeline has a backlog, so
+    engines that can trade accuracy for speed may do so.
+
+    Streaming engines set streaming = True and implement
+    start_stream/feed/end_stream; astream() wraps those for async callers.
+
+    Results are dicts with at least "text" and "final" (False for partial
+    results that a later one will replace). Where the backend provides
+    timing they also carry Whisper-style "segments", each with "start",
+    "end", "text" and optionally "words" ({"word", "start", "end"}), plus
+    "start"/"end" for the whole result. Batch engines report times relative
+    to the segment they were given; the pipeline shifts them to session
+    time. Streaming engines report session time directly. Engines that set
+    speaker_labels also put a "speaker" on the result, segments and words.
+    """
+
+    name = "engine"
+    streaming = False
+    speaker_labels = False
+
+    def __init__(self, language=None, cache=False):
+        self.language = language
+        self.cache = None
+        if cache:
+            from transcriptcache import TranscriptCache
+            self.cache = TranscriptCache()
+
+    def prepare(self):
+        """
+        Load models or open clients. Called once capture is already running.
+        """
+
+    def decode(self, audio, behind=False):
+        raise NotImplementedError
+
+    def cache_key(self):
+        return self.name
+
+    def transcribe(self, audio, behind=False):
+        if self.cache is None:
+            result = self.decode(audio, behind)
+        else:
+            result = self.cache.cached(audio, self.cache_key(), lambda: self.decode(audio, behind),
+                                       language=self.language)
+        result.setdefault("final", True)
+        return result
+
+    async def atranscribe(self, audio, behind=False):
+        return await asyncio.to_thread(self.transcribe, audio, behind)
+
+    def submit(self, audio, on_result, behind=False):
+        """
+        Hand one segment to the engine; on_result is called with the result.
+        Engines that keep several requests in flight override this and must
+        still deliver results in submission order.
+        """
+        on_result(self.transcribe(audio, behind))
+
+    def flush(self):
+        """
+        Wait for submitted segments to finish.
+        """
+
+    def start_stream(self, on_result):
+        raise NotImplementedError(f"{self.name} does not support streaming")
+
+    def feed(self, audio):
+        raise NotImplementedError(f"{self.name} does not support streaming")
+
+    def end_stream(self):
+        raise NotImplementedError(f"{self.name} does not support streaming")
+
+    async def astream(self, blocks, on_result):
+        """
+        Stream an async iterable of float32 blocks through the engine.
+        """
+        self.start_stream(on_result)
+        try:
+            async for block in blocks:
+                self.feed(block)
+        finally:
+            await asyncio.to_thread(self.end_stream)
+
+    def stats(self):
+        return {"cache_hit_rate": self.cache.hit_rate()} if self.cache else {}
+
+    def close(self):
+        pass
+
+
+def shift_result(result, offset, duration=None):
+    """
+    Return a copy of a result with its times moved by offset seconds. Results
+    without segments get start/end from offset and duration.
+    """
+    result = dict(result)
+    segments = []
+    for segment in result.get("segments") or []:
+        segment = dict(segment, start=segment["start"] + offset, end=segment["end"] + offset)
+        if "words" in segment:
+            segment["words"] = [dict(w, start=w["start"] + offset, end=w["end"] + offset)
+                                for w in segment["words"]]
+        segments.append(segment)
+    if segments:
+        result["segments"] = segments
+        result["start"], result["end"] = segments[0]["start"], segments[-1]["end"]
+    elif duration is not None:
+        result["start"], result["end"] = offset, offset + duration
+    return result
+
+
+def load_config(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def create_engine(config):
+    """
+    Build an engine from a config dict such as
+    {"engine": "whisper", "model": "base", "language": "en"}, a path to a
+    JSON file holding one, or just an engine name.
+    """
+    if isinstance(config, str):
+        config = load_config(config) if config.endswith(".json") else {"engine": config}
+    config = dict(config)
+    name = config.pop("engine")
+    if name not in ENGINES:
+        raise ValueError(f"Unknown engine {name!r}; choose from {', '.join(ENGINES)}")
+    module, cls = ENGINES[name]
+    return getattr(importlib.import_module(module), cls)(**config)
@@ -0,0 +1,39 @@
+import random
+import time
+
+from engines import TranscriptionEngine
+from metrics import metrics
+
+
+class FakeEngine(TranscriptionEngine):
+    """
+    Offline stand-in for a cloud or local backend. It sleeps for a
+    configurable latency, fails at a configurable rate and returns fixed
+    text, so routing and pipelines can be exercised without credentials,
+    network or models.
+    """
+
+    name = "fake"
+
+    def __init__(self, text="fake transcription", latency=0.2, jitter=0.0, error_rate=0.0,
+                 language=None, label=None, seed=None):
+        super().__init__(language)
+        self.text = text
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        if label is not None:
+            self.name = label
+        self.random = random.Random(seed)
+        self.calls = 0
+
+    def decode(self, audio, behind=False):
+        self.calls += 1
+        with metrics.span("decode"):
+            time.sleep(self.latency + self.random.uniform(0, self.jitter))
+        if self.random.random() < self.error_rate:
+            raise RuntimeError(f"{self.name}: simulated backend error")
+        return {"text": self.text}
+
+    def stats(self):
+        return {"calls": self.calls}
@@ -0,0 +1,209 @@
+import bisect
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+import google.auth
+from dotenv import load_dotenv
+from google.cloud import speech_v1p1beta1 as speech
+
+from diarization import split_by_speaker
+from engines import TranscriptionEngine
+from metrics import metrics
+from pcmencode import PcmEncoder
+
+load_dotenv()
+
+# Google ends a streaming session after about 305 s; restart a little earlier.
+STREAM_LIMIT_SECONDS = 290
+
+
+def make_client():
+    credentials, _ = google.auth.load_credentials_from_file(os.getenv("GOOGLE_APPLICATION_CREDENTIALS"))
+    return speech.SpeechClient(credentials=credentials)
+
+
+def make_segment(alternative, offset=0.0):
+    """
+    Whisper-style segment from a recognition alternative with word offsets.
+    """
+    words = [{"word": " " + w.word, "start": offset + w.start_time.total_seconds(),
+              "end": offset + w.end_time.total_seconds()} for w in alternative.words]
+    if not words:
+        return None
+    return {"start": words[0]["start"], "end": words[-1]["end"], "text": alternative.transcript, "words": words}
+
+
+class GoogleEngine(TranscriptionEngine):
+    """
+    Google Speech-to-Text synchronous recognize on speech segments, sent as
+    in-memory LINEAR16. Identical audio is answered from the transcript cache.
+    diarize asks Google for speaker tags (up to max_speakers).
+    """
+
+    name = "google"
+
+    def __init__(self, language="en-US", samplerate=16000, cache=True, diarize=False, max_speakers=4):
+        super().__init__(language, cache)
+        self.speaker_labels = diarize
+        self.max_speakers = max_speakers
+        self.samplerate = samplerate
+        self.client = None
+        self.encoder = PcmEncoder()
+
+    def prepare(self):
+        if self.client is None:
+            self.client = make_client()
+
+    def cache_key(self):
+        return "google-speech/speakers" if self.speaker_labels else "google-speech"
+
+    def decode(self, audio, behind=False):
+        self.prepare()
+        try:
+            diarization = None
+            if self.speaker_labels:
+                diarization = speech.SpeakerDiarizationConfig(
+                    enable_speaker_diarization=True, min_speaker_count=1, max_speaker_count=self.max_speakers,
+                )
+            config = speech.RecognitionConfig(
+                encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
+                sample_rate_hertz=self.samplerate,
+                language_code=self.language,
+                enable_word_time_offsets=True,
+                diarization_config=diarization,
+            )
+            # Raw int16 LINEAR16 straight from memory: half the size of float32 WAV, no temp file
+            content = bytes(self.encoder.pcm_bytes(audio))
+            with metrics.span("rpc"):
+                response = self.client.recognize(config=config, audio=speech.RecognitionAudio(content=content))
+            alternatives = [r.alternatives[0] for r in response.results if r.alternatives]
+            text = "".join(a.transcript for a in alternatives)
+            if self.speaker_labels and alternatives:
+                return self.speaker_result(text, alternatives[-1])
+            segments = [make_segment(a) for a in alternatives]
+            return {"text": text, "segments": [s for s in segments if s is not None]}
+        except Exception as e:
+            print(f"Error during Google Speech-to-Text job: {e}")
+            raise
+
+    def speaker_result(self, text, alternative):
+        # With diarization the last result repeats every word with its speaker tag
+        words = [{"word": " " + w.word, "start": w.start_time.total_seconds(),
+                  "end": w.end_time.total_seconds(), "speaker": f"spk_{w.speaker_tag}"}
+                 for w in alternative.words]
+        if not words:
+            return {"text": text}
+        return {"text": text, "speaker": words[0]["speaker"], "segments": split_by_speaker(words)}
+
+
+class GoogleStreamingEngine(TranscriptionEngine):
+    """
+    streaming_recognize with interim results. Sessions are restarted before
+    Google's time limit from the audio still queued, and per-utterance latency
+    (capture of the audio at a final result's end time to its arrival) is
+    recorded.
+    """
+
+    name = "google-stream"
+    streaming = True
+
+    def __init__(self, language="en-US", samplerate=16000, max_queue=100, latency_window=1000):
+        super().__init__(language)
+        self.samplerate = samplerate
+        self.client = None
+        self.encoder = PcmEncoder()
+        # Bounded so a stalled connection drops audio instead of growing memory
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self.sent_seconds = 0.0
+        self.latencies = deque(maxlen=latency_window)
+        self.finals = 0
+        self.running = False
+        self.thread = None
+
+    def prepare(self):
+        if self.client is None:
+            self.client = make_client()
+
+    def start_stream(self, on_result):
+        self.prepare()
+        self.running = True
+        self.thread = threading.Thread(target=self.worker, args=(on_result,), daemon=True)
+        self.thread.start()
+
+    def feed(self, audio):
+        try:
+            self.queue.put_nowait((bytes(self.encoder.pcm_bytes(audio)), time.monotonic()))
+        except queue.Full:
+            self.dropped += 1
+
+    def end_stream(self):
+        self.running = False
+        self.thread.join()
+
+    def worker(self, on_result):
+        config = speech.StreamingRecognitionConfig(
+            config=speech.RecognitionConfig(
+                encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
+                sample_rate_hertz=self.samplerate,
+                language_code=self.language,
+                enable_word_time_offsets=True,
+            ),
+            interim_results=True,
+        )
+        while self.running:
+            # Audio offset (seconds) at the end of each sent block, and when
+            # that block was captured, to measure per-utterance latency.
+            offsets, captured = [], []
+            # Session times restart at zero; results are reported in stream time
+            base = self.sent_seconds
+            try:
+                requests = self.stream_requests(offsets, captured)
+                for response in self.client.streaming_recognize(config, requests):
+                    for result in response.results:
+                        if not result.alternatives:
+                            continue
+                        end = result.result_end_time.total_seconds()
+                        on_result(self.make_result(result, base, end))
+                        if result.is_final:
+                            self.finals += 1
+                            i = min(bisect.bisect_left(offsets, end), len(captured) - 1)
+                            if i >= 0:
+                                self.latencies.append(time.monotonic() - captured[i])
+            except Exception as e:
+                print(f"Error during Google streaming session: {e}")
+                time.sleep(1)
+
+    def stream_requests(self, offsets, captured):
+        session_start = time.monotonic()
+        sent = 0.0
+        while self.running and time.monotonic() - session_start < STREAM_LIMIT_SECONDS:
+            try:
+                chunk, captured_at = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            sent += len(chunk) / 2 / self.samplerate
+            self.sent_seconds += len(chunk) / 2 / self.samplerate
+            offsets.append(sent)
+            captured.append(captured_at)
+            yield speech.StreamingRecognizeRequest(audio_content=chunk)
+
+    def make_result(self, result, base, end):
+        alternative = result.alternatives[0]
+        out = {"text": alternative.transcript, "final": result.is_final, "end": base + end}
+        segment = make_segment(alternative, base) if result.is_final else None
+        if segment is not None:
+            out["start"] = segment["start"]
+            out["segments"] = [segment]
+        return out
+
+    def stats(self):
+        stats = {"dropped_blocks": self.dropped, "finals": self.finals}
+        if self.latencies:
+            latencies = sorted(self.latencies)
+            stats["latency_mean"] = sum(latencies) / len(latencies)
+            stats["latency_p95"] = latencies[int(0.95 * (len(latencies) - 1))]
+        return stats
@@ -1,91 +1,34 @@
 import sys
-import sounddevice as sd
 import numpy as np
-from PySide6.QtCore import QThread, Signal, QObject
-from PySide6.QtGui import QGuiApplication
-from PySide6.QtQml import QQmlApplicationEngine
-from google.cloud import speech_v1p1beta1 as speech
-import tempfile
-import os
-from dotenv import load_dotenv
-import google.auth
+from engines import create_engine
+from transcriptionapp import EngineThread, run_app
 
-load_dotenv()
 
-class TranscriptionThread(QThread):
-    transcription_signal = Signal(str)
+class TranscriptionThread(EngineThread):
+    """
+    Google Speech-to-Text: recognize on speech segments, or with
+    streaming=True one streaming_recognize session with interim results.
+    """
 
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.running = False
-        credentials, _ = google.auth.load_credentials_from_file(os.getenv("GOOGLE_APPLICATION_CREDENTIALS"))
-        self.client = speech.SpeechClient(credentials=credentials)
+    def __init__(self, parent=None, streaming=False):
+        engine = create_engine({"engine": "google-stream" if streaming else "google", "language": "en-US"})
+        super().__init__(engine, parent)
+        self.streaming = streaming
 
     def run(self):
-        self.running = True
-        samplerate = 16000
-        duration = 5
+        super().run()
+        self.print_latency()
 
-        with sd.InputStream(samplerate=samplerate, channels=1, dtype="float32") as stream:
-            print("Listening...")
-            while self.running:
-                try:
-                    audio_chunk = stream.read(int(samplerate * duration))[0].flatten()
-                    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_audio_file:
-                        temp_audio_path = temp_audio_file.name
-                        self.save_wav(temp_audio_path, audio_chunk, samplerate)
-                        transcription = self.transcribe_audio(temp_audio_path)
-                        self.transcription_signal.emit(transcription)
-                    os.remove(temp_audio_path)
-                except Exception as e:
-                    print(f"Error during transcription: {e}")
-                    self.transcription_signal.emit("Transcription failed. Check logs for details.")
+    def print_latency(self):
+        # The streaming engine measures from capture to final result; batch
+        # latency is measured by the pipeline from segment end to result.
+        latencies = self.engine.latencies if self.streaming else self.pipeline.latencies
+        if latencies:
+            latencies = np.array(latencies)
+            mode = "streaming" if self.streaming else "batch"
+            print(f"Per-utterance latency ({mode}): mean {latencies.mean():.2f}s, "
+                  f"p95 {np.percentile(latencies, 95):.2f}s over the last {len(latencies)} utterances")
 
-    def stop(self):
-        self.running = False
-
-    def save_wav(self, file_path, audio_data, samplerate):
-        import scipy.io.wavfile as wav
-        wav.write(file_path, samplerate, audio_data)
-
-    def transcribe_audio(self, audio_file_path):
-        try:
-            with open(audio_file_path, "rb") as audio_file:
-                content = audio_file.read()
-            audio = speech.RecognitionAudio(content=content)
-            config = speech.RecognitionConfig(
-                encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
-                sample_rate_hertz=16000,
-                language_code="en-US",
-            )
-            response = self.client.recognize(config=config, audio=audio)
-            transcription = ""
-            for result in response.results:
-                transcription += result.alternatives[0].transcript
-            return transcription
-        except Exception as e:
-            print(f"Error during Google Speech-to-Text job: {e}")
-            return "Transcription failed. Check logs for details."
 
 if __name__ == "__main__":
-    app = QGuiApplication(sys.argv)
-    engine = QQmlApplicationEngine()
-    engine.load("transcription_app.qml")
-    if not engine.rootObjects():
-        print("Error: Failed to load QML file.")
-        sys.exit(-1)
-    root = engine.rootObjects()[0]
-    if root is None:
-        print("Error: Root object not found in QML file.")
-        sys.exit(-1)
-    transcription_display = root.findChild(QObject, "transcriptionDisplay")
-    if transcription_display is None:
-        print("Error: 'transcriptionDisplay' element not found in QML.")
-        sys.exit(-1)
-    transcription_thread = TranscriptionThread()
-    transcription_thread.transcription_signal.connect(
-        lambda text: transcription_display.setProperty("text", text)
-    )
-    root.findChild(QObject, "startButton").clicked.connect(transcription_thread.start)
-    root.findChild(QObject, "stopButton").clicked.connect(transcription_thread.stop)
-    sys.exit(app.exec())
\ No newline at end of file
+    sys.exit(run_app(TranscriptionThread(streaming="--stream" in sys.argv)))
@@ -0,0 +1,211 @@
+import itertools
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class Job:
+    """
+    One queued call. status, progress (0..1), partial (whatever the job
+    has produced so far), result and error are updated by the worker and can
+    be read from any thread.
+    """
+
+    def __init__(self, job_id, fn, args, kwargs):
+        self.id = job_id
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.status = QUEUED
+        self.progress = 0.0
+        self.partial = None
+        self.result = None
+        self.error = None
+        self.submitted = time.monotonic()
+        self.started = None
+        self.finished = None
+
+    def set_progress(self, fraction, partial=None):
+        self.progress = min(1.0, max(0.0, fraction))
+        if partial is not None:
+            self.partial = partial
+
+    def done(self):
+        return self.status in (DONE, FAILED)
+
+
+class JobQueue:
+    """
+    First-in, first-out job queue with a fixed number of worker threads, for
+    sharing one model between many users of a web app. Jobs are called as
+    fn(*args, progress=job.set_progress, **kwargs) and may report
+    progress(fraction, partial). At most max_queued jobs may wait; submit()
+    raises RuntimeError beyond that. Finished jobs are kept (up to
+    keep_finished) so pages can pick up their results.
+    """
+
+    def __init__(self, workers=2, max_queued=32, keep_finished=256):
+        self.max_queued = max_queued
+        self.pending = deque()
+        self.jobs = {}
+        self.finished = deque(maxlen=keep_finished)
+        self.ids = itertools.count(1)
+        self.condition = threading.Condition()
+        self.threads = [threading.Thread(target=self.worker, daemon=True, name=f"job-worker-{i}")
+                        for i in range(workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, fn, *args, **kwargs):
+        with self.condition:
+            if len(self.pending) >= self.max_queued:
+                raise RuntimeError("Too many jobs queued, try again shortly")
+            job = Job(next(self.ids), fn, args, kwargs)
+            self.jobs[job.id] = job
+            self.pending.append(job)
+            self.condition.notify()
+        return job
+
+    def get(self, job_id):
+        with self.condition:
+            return self.jobs.get(job_id)
+
+    def position(self, job):
+        """
+        1-based place in the queue, or 0 once the job has started.
+        """
+        with self.condition:
+            try:
+                return self.pending.index(job) + 1
+            except ValueError:
+                return 0
+
+    def worker(self):
+        while True:
+            with self.condition:
+                while not self.pending:
+                    self.condition.wait()
+                job = self.pending.popleft()
+                job.status = RUNNING
+                job.started = time.monotonic()
+            try:
+                job.result = job.fn(*job.args, progress=job.set_progress, **job.kwargs)
+                job.status = DONE
+            except Exception as e:
+                print(f"Error in job {job.id}: {e}")
+                job.error = str(e)
+                job.status = FAILED
+            job.finished = time.monotonic()
+            job.set_progress(1.0)
+            with self.condition:
+                # Forget the oldest finished jobs so memory stays bounded
+                if len(self.finished) == self.finished.maxlen:
+                    self.jobs.pop(self.finished[0].id, None)
+                self.finished.append(job)
+
+    def stats(self):
+        with self.condition:
+            running = sum(1 for job in self.jobs.values() if job.status == RUNNING)
+            return {"queued": len(self.pending), "running": running, "workers": len(self.threads)}
+
+
+class FairPool:
+    """
+    Fixed worker threads shared by several producers, each identified by a
+    key (e.g. one microphone channel). Every key has its own FIFO and
+    workers take from the keys in turn, running at most one task per key at
+    a time: tasks of a key finish in the order they were submitted, and a
+    busy key cannot starve the quiet ones. Tasks are plain callables.
+
+    At most max_per_key tasks wait per key. For live audio a stale task is
+    worth less than a fresh one, so submit() then drops the oldest waiting
+    task of that key (counted in stats) instead of blocking the producer.
+    """
+
+    def __init__(self, workers=2, max_per_key=4):
+        self.max_per_key = max_per_key
+        self.queues = OrderedDict()
+        self.busy = set()
+        self.dropped = Counter()
+        self.done = Counter()
+        self.closed = False
+        self.condition = threading.Condition()
+        self.threads = [threading.Thread(target=self.worker, daemon=True, name=f"fair-worker-{i}")
+                        for i in range(workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, key, task):
+        """
+        Queue task() under key. Returns False if an older task was dropped.
+        """
+        with self.condition:
+            if self.closed:
+                raise RuntimeError("Pool is closed")
+            queue = self.queues.setdefault(key, deque())
+            dropped = len(queue) >= self.max_per_key
+            if dropped:
+                queue.popleft()
+                self.dropped[key] += 1
+            queue.append(task)
+            self.condition.notify()
+        return not dropped
+
+    def waiting(self, key):
+        with self.condition:
+            return len(self.queues.get(key, ()))
+
+    def next_task(self):
+        # First key in rotation with work and nothing running; it moves to the back
+        for key, queue in self.queues.items():
+            if queue and key not in self.busy:
+                self.queues.move_to_end(key)
+                self.busy.add(key)
+                return key, queue.popleft()
+        return None
+
+    def worker(self):
+        while True:
+            with self.condition:
+                item = self.next_task()
+                while item is None:
+                    if self.closed and not any(self.queues.values()):
+                        return
+                    self.condition.wait()
+                    item = self.next_task()
+            key, task = item
+            try:
+                task()
+            except Exception as e:
+                print(f"Error in task for {key}: {e}")
+            with self.condition:
+                self.busy.discard(key)
+                self.done[key] += 1
+                self.condition.notify_all()
+
+    def close(self, wait=True):
+        """
+        Stop taking tasks; with wait, let the queued ones finish first.
+        """
+        with self.condition:
+            self.closed = True
+            if not wait:
+                for queue in self.queues.values():
+                    queue.clear()
+            self.condition.notify_all()
+        if wait:
+            for thread in self.threads:
+                thread.join()
+
+    def stats(self):
+        with self.condition:
+            return {
+                "waiting": sum(len(q) for q in self.queues.values()),
+                "running": len(self.busy),
+                "workers": len(self.threads),
+                "dropped_segments": sum(self.dropped.values()),
+                "per_key": {str(key): {"waiting": len(queue), "done": self.done[key], "dropped": self.dropped[key]}
+                            for key, queue in self.queues.items()},
+            }
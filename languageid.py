@@ -0,0 +1,316 @@
+import contextlib
+import queue
+import threading
+import time
+from collections import deque
+
+from engines import TranscriptionEngine, create_engine, shift_result
+from metrics import metrics
+from vad import EnergyVAD, SpeechSegmenter
+from whisperfeatures import supports_features
+
+# Whisper language -> streaming language code, where AWS and Google agree.
+# Languages given as full codes ("ja-JP") are used as they are.
+STREAMING_CODES = {
+    "en": "en-US",
+    "ja": "ja-JP",
+    "es": "es-US",
+    "fr": "fr-FR",
+    "de": "de-DE",
+    "it": "it-IT",
+    "pt": "pt-BR",
+    "ko": "ko-KR",
+    "zh": "zh-CN",
+    "hi": "hi-IN",
+}
+
+# Where Google's streaming API wants a different code
+GOOGLE_CODES = {"zh": "cmn-Hans-CN"}
+
+
+def streaming_code(language, backend="aws-stream"):
+    """
+    Backend language code for a Whisper code or a full code.
+    """
+    if "-" in language:
+        return language
+    if backend.startswith("google") and language in GOOGLE_CODES:
+        return GOOGLE_CODES[language]
+    if language not in STREAMING_CODES:
+        raise ValueError(f"No streaming code for {language!r}; give a full code such as 'ja-JP'")
+    return STREAMING_CODES[language]
+
+
+def whisper_code(language):
+    return language.split("-")[0].lower()
+
+
+class LanguageDetector:
+    """
+    Whisper's language detector (one encoder pass and one decoder step on
+    the first 30 s), limited to the languages a session can switch between.
+    Uses the shared model from the registry, so a tiny model already loaded
+    elsewhere is reused.
+    """
+
+    def __init__(self, languages, model="tiny", backend=None):
+        self.languages = list(languages)
+        self.model_name = model
+        self.backend = backend
+        self.model = None
+        self.detections = 0
+
+    def prepare(self):
+        if self.model is None:
+            from modelregistry import registry
+            self.model = registry.get(self.model_name, self.backend)
+
+    def detect(self, audio):
+        """
+        {language: probability} over self.languages for float32 16 kHz audio.
+        """
+        self.prepare()
+        with metrics.span("language_id"):
+            if supports_features(self.model):
+                probs = self.detect_probs(audio)
+            else:
+                # faster-whisper and whisperserver only offer transcribe()
+                language = self.model.transcribe(audio, fp16=False).get("language")
+                probs = {language: 1.0}
+        self.detections += 1
+        scores = {language: probs.get(language, 0.0) for language in self.languages}
+        total = sum(scores.values())
+        return {language: score / total for language, score in scores.items()} if total else scores
+
+    def detect_probs(self, audio):
+        import torch
+        import whisper
+
+        mel = whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), self.model.dims.n_mels)
+        with self.model.lock, torch.no_grad():
+            _, probs = self.model.detect_language(mel.to(self.model.device))
+        return probs
+
+
+class StreamSession:
+    """
+    One open streaming session and the state needed to hand over to it:
+    offset is the session time of its first audio, since is the time from
+    which its results are shown, and recent keeps what it said while on
+    standby.
+    """
+
+    def __init__(self, language, engine, offset):
+        self.language = language
+        self.engine = engine
+        self.offset = offset
+        self.since = None
+        self.recent = deque(maxlen=50)
+
+
+class AutoLanguageEngine(TranscriptionEngine):
+    """
+    Streaming transcription that follows the spoken language.
+
+    Speech segments of up to detect_seconds are run through Whisper's
+    language detector on a background thread. When a segment is detected as
+    another of the configured languages with at least min_probability, the
+    output switches to a streaming session (aws-stream or google-stream) in
+    that language from the start of the segment on.
+
+    With standby, a second session (the next language at first, then the
+    previously active one) is kept open and fed the same audio, so a switch
+    to it is immediate and what it already heard is shown from the switch
+    point; this streams every second of audio twice. Switching to a language
+    without an open session opens one and replays the last replay_seconds
+    of audio into it first.
+
+    languages are Whisper codes ("ja") or full codes ("ja-JP"); initial
+    defaults to the first. Results carry the Whisper "language" they were
+    transcribed in.
+    """
+
+    name = "auto-stream"
+    streaming = True
+
+    def __init__(self, backend="aws-stream", languages=("en-US", "ja-JP"), initial=None, model="tiny",
+                 detect_seconds=3.0, min_seconds=1.0, min_probability=0.7, standby=True, replay_seconds=10.0,
+                 samplerate=16000, **options):
+        super().__init__(None)
+        self.backend = backend
+        self.codes = {whisper_code(language): streaming_code(language, backend) for language in languages}
+        self.initial = whisper_code(initial) if initial else next(iter(self.codes))
+        if self.initial not in self.codes:
+            raise ValueError(f"Initial language {initial!r} is not one of {list(languages)}")
+        self.options = options
+        self.detector = LanguageDetector(self.codes, model)
+        self.samplerate = samplerate
+        self.min_samples = int(min_seconds * samplerate)
+        self.min_probability = min_probability
+        self.use_standby = standby
+        self.detect_seconds = detect_seconds
+        self.segmenter = None
+        self.history = deque()
+        self.replay_seconds = replay_seconds
+        self.lock = threading.Lock()
+        self.sessions = {}
+        self.active = None
+        self.fed_seconds = 0.0
+        self.on_result = None
+        self.detect_queue = queue.Queue(maxsize=2)
+        self.detect_thread = None
+        self.switches = 0
+        self.skipped_detections = 0
+
+    def create(self, language):
+        engine = create_engine(dict(self.options, engine=self.backend, language=self.codes[language]))
+        engine.prepare()
+        return engine
+
+    def prepare(self):
+        self.detector.prepare()
+
+    def start_stream(self, on_result):
+        self.on_result = on_result
+        self.fed_seconds = 0.0
+        self.history.clear()
+        self.segmenter = SpeechSegmenter(EnergyVAD(self.samplerate), max_seconds=self.detect_seconds)
+        self.active = self.initial
+        self.open(self.initial).since = 0.0
+        if self.use_standby and len(self.codes) > 1:
+            self.open(next(language for language in self.codes if language != self.initial))
+        self.detect_thread = threading.Thread(target=self.detect_worker, daemon=True, name="language-id")
+        self.detect_thread.start()
+        print(f"Language: {self.codes[self.initial]}")
+
+    def open(self, language, replay_from=None):
+        """
+        Start a session for language; with replay_from, first feed it the
+        buffered audio from that time on.
+        """
+        engine = self.create(language)
+        session = StreamSession(language, engine, None)
+        try:
+            engine.start_stream(lambda result: self.deliver(session, result))
+            # Replay outside the lock, so capture and the other sessions keep
+            # going, until nothing new has arrived; then register the session
+            # in the same locked step, so it gets every later block from feed()
+            sent = replay_from
+            while True:
+                with self.lock:
+                    blocks = [] if sent is None else [(start, audio) for start, audio in self.history
+                                                      if start + len(audio) / self.samplerate > sent]
+                    if session.offset is None:
+                        session.offset = blocks[0][0] if blocks else self.fed_seconds
+                    if not blocks:
+                        self.sessions[language] = session
+                        return session
+                for _, audio in blocks:
+                    engine.feed(audio)
+                sent = blocks[-1][0] + len(blocks[-1][1]) / self.samplerate
+        except Exception:
+            with contextlib.suppress(Exception):
+                engine.end_stream()
+            raise
+
+    def feed(self, audio):
+        with self.lock:
+            self.history.append((self.fed_seconds, audio))
+            self.fed_seconds += len(audio) / self.samplerate
+            while self.history and self.history[0][0] < self.fed_seconds - self.replay_seconds:
+                self.history.popleft()
+            sessions = list(self.sessions.values())
+        # Outside the lock: a backend may deliver results from feed()
+        for session in sessions:
+            session.engine.feed(audio)
+        for start, segment in self.segmenter.push(audio, with_start=True):
+            if len(segment) >= self.min_samples:
+                try:
+                    self.detect_queue.put_nowait((start, segment))
+                except queue.Full:
+                    self.skipped_detections += 1
+
+    def deliver(self, session, result):
+        result = shift_stream_result(result, session.offset)
+        result["language"] = session.language
+        with self.lock:
+            if session.language != self.active:
+                session.recent.append(result)
+                return
+            if result.get("end", session.since) < session.since:
+                return
+            self.on_result(result)
+
+    def detect_worker(self):
+        while True:
+            item = self.detect_queue.get()
+            if item is None:
+                return
+            start, segment = item
+            try:
+                probs = self.detector.detect(segment)
+                language = max(probs, key=probs.get)
+                if language != self.active and probs[language] >= self.min_probability:
+                    self.switch(language, start)
+            except Exception as e:
+                # The active session carries on; the next segment tries again
+                print(f"Language detection or switch failed: {e}")
+
+    def switch(self, language, at):
+        """
+        Make language's session the output from session time at on.
+        """
+        started = time.perf_counter()
+        session = self.sessions.get(language) or self.open(language, replay_from=at)
+        closing = []
+        with self.lock:
+            previous = self.active
+            self.active = language
+            session.since = at
+            for result in session.recent:
+                if result.get("end", at) >= at:
+                    self.on_result(result)
+            session.recent.clear()
+            # Keep the language just left as the standby, close any other
+            for other in list(self.sessions):
+                if other != language and (other != previous or not self.use_standby):
+                    closing.append(self.sessions.pop(other))
+        self.switches += 1
+        metrics.count("language_switches")
+        print(f"Language: {self.codes[previous]} -> {self.codes[language]} at {at:.1f}s "
+              f"({time.perf_counter() - started:.2f}s to switch)")
+        for old in closing:
+            threading.Thread(target=old.engine.end_stream, daemon=True).start()
+
+    def end_stream(self):
+        self.detect_queue.put(None)
+        self.detect_thread.join()
+        for session in list(self.sessions.values()):
+            session.engine.end_stream()
+        self.sessions.clear()
+
+    def stats(self):
+        with self.lock:
+            active = self.sessions.get(self.active)
+            standby = [language for language in self.sessions if language != self.active]
+        stats = active.engine.stats() if active is not None else {}
+        stats.update(language=self.codes.get(self.active), standby=",".join(self.codes[l] for l in standby),
+                     language_switches=self.switches, language_detections=self.detector.detections,
+                     skipped_detections=self.skipped_detections)
+        return stats
+
+
+def shift_stream_result(result, offset):
+    """
+    Move a streaming result by offset seconds, including the start/end of
+    partial results that have no segments.
+    """
+    if not offset:
+        return dict(result)
+    if result.get("segments"):
+        return shift_result(result, offset)
+    result = dict(result)
+    for key in ("start", "end"):
+        if key in result:
+            result[key] += offset
+    return result
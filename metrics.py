@@ -0,0 +1,214 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# Stages timed on the live path, in pipeline order
+STAGES = ["capture_wait", "preprocess", "language_id", "encode", "decode", "rpc", "emit"]
+
+
+class NullSpan:
+    """
+    What span() returns while metrics are off: entering and leaving it does
+    nothing, so instrumented code costs one attribute check.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class Span:
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    """
+    Process-wide timing spans, counters and gauges for live sessions.
+
+    Off by default: span() then returns NULL_SPAN and observe(), count() and
+    gauge() return straight away. Once enable()d, each stage keeps its last
+    window durations for rolling percentiles plus running totals.
+
+    Stages (see STAGES): capture_wait is time blocked on the microphone
+    buffer; preprocess is VAD segmentation, PCM encoding and streaming
+    log-mel; language_id is Whisper language detection for auto-stream;
+    encode and decode split a local Whisper call (decode includes
+    transcribe()'s own log-mel and alignment; backends without a PyTorch
+    encoder report it all as decode);
+    rpc is a cloud or whisperserver round trip; emit is delivering a result
+    to the front-end.
+    """
+
+    def __init__(self, window=500):
+        self.enabled = False
+        self.window = window
+        self.lock = threading.Lock()
+        self.timings = {}
+        self.totals = {}
+        self.counters = {}
+        self.gauges = {}
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def span(self, stage):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, stage)
+
+    def observe(self, stage, seconds):
+        if not self.enabled:
+            return
+        with self.lock:
+            if stage not in self.timings:
+                self.timings[stage] = deque(maxlen=self.window)
+                self.totals[stage] = [0, 0.0]
+            self.timings[stage].append(seconds)
+            total = self.totals[stage]
+            total[0] += 1
+            total[1] += seconds
+
+    def count(self, name, n=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def gauge(self, name, value):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.gauges[name] = value
+
+    def snapshot(self):
+        """
+        {"spans": {stage: {count, total_seconds, last, p50, p95}}, "counters",
+        "gauges"} with durations in seconds.
+        """
+        with self.lock:
+            timings = {stage: np.array(values) for stage, values in self.timings.items()}
+            totals = {stage: tuple(total) for stage, total in self.totals.items()}
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+        spans = {}
+        for stage, values in timings.items():
+            spans[stage] = {
+                "count": totals[stage][0],
+                "total_seconds": totals[stage][1],
+                "last": float(values[-1]),
+                "p50": float(np.percentile(values, 50)),
+                "p95": float(np.percentile(values, 95)),
+            }
+        return {"spans": spans, "counters": counters, "gauges": gauges}
+
+    def summary(self):
+        """
+        Flat per-stage p50/p95 in milliseconds, for the stats overlay.
+        """
+        summary = {}
+        for stage, span in self.snapshot()["spans"].items():
+            summary[f"{stage}_p50_ms"] = 1000 * span["p50"]
+            summary[f"{stage}_p95_ms"] = 1000 * span["p95"]
+        return summary
+
+    def prometheus(self, prefix="transcription"):
+        """
+        The snapshot in the Prometheus text exposition format.
+        """
+        snapshot = self.snapshot()
+        lines = [f"# TYPE {prefix}_stage_seconds summary"]
+        for stage, span in snapshot["spans"].items():
+            for quantile in ("p50", "p95"):
+                lines.append(f'{prefix}_stage_seconds{{stage="{stage}",quantile="0.{quantile[1:]}"}} '
+                             f'{span[quantile]:.6f}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {span["total_seconds"]:.6f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {span["count"]}')
+        for name, value in sorted(snapshot["counters"].items()):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+        for name, value in sorted(snapshot["gauges"].items()):
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            lines.append(f"{prefix}_{name} {float(value):g}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self.lock:
+            self.timings.clear()
+            self.totals.clear()
+            self.counters.clear()
+            self.gauges.clear()
+
+
+metrics = Metrics()
+
+
+def make_handler(metrics):
+    class Handler(BaseHTTPRequestHandler):
+        """
+        GET /metrics in Prometheus text format, GET /metrics.json as JSON.
+        """
+
+        def do_GET(self):
+            if self.path == "/metrics":
+                self.send(metrics.prometheus().encode(), "text/plain; version=0.0.4")
+            elif self.path == "/metrics.json":
+                self.send(json.dumps(metrics.snapshot()).encode(), "application/json")
+            else:
+                self.send_error(404)
+
+        def send(self, data, content_type):
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(port=9464, host="127.0.0.1"):
+    """
+    Enable metrics and serve them on a background thread. Returns the server.
+    """
+    metrics.enable()
+    httpd = ThreadingHTTPServer((host, port), make_handler(metrics))
+    threading.Thread(target=httpd.serve_forever, daemon=True, name="metrics-http").start()
+    print(f"Metrics on http://{host}:{port}/metrics")
+    return httpd
+
+
+def enable_from_env():
+    """
+    TRANSCRIPTION_METRICS=1 turns metrics on; a port number also serves them
+    there. Returns True if metrics are on.
+    """
+    setting = os.getenv("TRANSCRIPTION_METRICS", "")
+    if setting.isdigit() and int(setting) > 1:
+        serve(int(setting))
+    elif setting not in ("", "0"):
+        metrics.enable()
+    return metrics.enabled
@@ -0,0 +1,189 @@
+import os
+import threading
+import time
+import numpy as np
+from metrics import metrics
+from whisperbackends import load_model, select_backend
+
+MODEL_NAMES = ["tiny", "base", "small", "medium"]
+
+
+class SharedModel:
+    """
+    One loaded Whisper model shared by every thread in the process.
+
+    Whisper installs its KV-cache hooks on the model for each decode, so two
+    decodes must not run on the same instance at once; transcribe() serializes
+    them. Everything else is forwarded to the underlying model.
+
+    With metrics enabled each call is timed as an encode span (PyTorch
+    encoder forward passes) and a decode span (the rest of the call).
+    """
+
+    def __init__(self, name, model, load_seconds, backend="torch"):
+        self.name = name
+        self.backend = backend
+        self.model = model
+        self.load_seconds = load_seconds
+        self.lock = threading.Lock()
+        self.ready = threading.Event()
+        self.encode_seconds = None
+
+    def transcribe(self, audio, **options):
+        with self.lock:
+            if not metrics.enabled:
+                return self.model.transcribe(audio, **options)
+            if self.encode_seconds is None:
+                self.time_encoder()
+            self.encode_seconds = 0.0
+            start = time.perf_counter()
+            result = self.model.transcribe(audio, **options)
+            elapsed = time.perf_counter() - start
+            encode = self.encode_seconds
+        if encode:
+            metrics.observe("encode", encode)
+        metrics.observe("decode", elapsed - encode)
+        return result
+
+    def time_encoder(self):
+        """
+        Add up encoder forward time per call through PyTorch hooks. Only
+        installed once metrics are on, so untimed sessions pay nothing.
+        """
+        encoder = getattr(self.model, "encoder", None)
+        if not hasattr(encoder, "register_forward_pre_hook"):
+            return
+        started = []
+
+        def before(module, args):
+            started.append(time.perf_counter())
+
+        def after(module, args, output):
+            self.encode_seconds += time.perf_counter() - started.pop()
+
+        encoder.register_forward_pre_hook(before)
+        encoder.register_forward_hook(after)
+
+    def warm_up(self):
+        """
+        Decode one second of silence so the first real chunk doesn't pay for
+        lazy initialisation.
+        """
+        start = time.perf_counter()
+        self.transcribe(np.zeros(16000, dtype=np.float32), fp16=False, language="en")
+        self.ready.set()
+        print(f"Warmed up {self.name} in {time.perf_counter() - start:.1f}s")
+
+    def parameter_bytes(self):
+        """
+        Size of the weights, counting int8-packed layers at their real size.
+        0 for backends that don't expose a PyTorch state dict.
+        """
+        if not hasattr(self.model, "state_dict"):
+            return 0
+        total = 0
+        for value in self.model.state_dict().values():
+            for t in value if isinstance(value, tuple) else (value,):
+                if hasattr(t, "element_size"):
+                    total += t.numel() * t.element_size()
+        return total
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+
+class ModelRegistry:
+    """
+    Process-wide Whisper models: loaded lazily on first use, one instance per
+    name and backend, warmed up in the background after loading.
+    """
+
+    def __init__(self):
+        self.models = {}
+        self.lock = threading.Lock()
+        self.load_locks = {}
+
+    def get(self, name, backend=None, warm_up=True):
+        """
+        Return the shared model, loading it on first use. backend=None uses
+        WHISPER_BACKEND (see whisperbackends). If WHISPER_SERVER is set, return
+        a client for that server instead of loading locally.
+        """
+        key = self.key(name, backend)
+        server = os.getenv("WHISPER_SERVER")
+        if server:
+            from whisperserver import RemoteModel
+            with self.lock:
+                return self.models.setdefault(key, RemoteModel(name, server))
+
+        with self.lock:
+            load_lock = self.load_locks.setdefault(key, threading.Lock())
+        with load_lock:
+            if key not in self.models:
+                start = time.perf_counter()
+                model = load_model(*key)
+                shared = SharedModel(name, model, time.perf_counter() - start, key[1])
+                print(f"Loaded {name} ({key[1]}) in {shared.load_seconds:.1f}s "
+                      f"({shared.parameter_bytes() / 2**20:.0f} MB of weights)")
+                if warm_up:
+                    threading.Thread(target=shared.warm_up, daemon=True).start()
+                else:
+                    shared.ready.set()
+                with self.lock:
+                    self.models[key] = shared
+            return self.models[key]
+
+    def preload(self, name, backend=None):
+        """
+        Load (and warm up) a model on a background thread.
+        """
+        thread = threading.Thread(target=self.get, args=(name, backend), daemon=True)
+        thread.start()
+        return thread
+
+    @staticmethod
+    def key(name, backend=None):
+        # Models served by WHISPER_SERVER are registered under the "server" backend
+        return (name, "server" if os.getenv("WHISPER_SERVER") else select_backend(backend))
+
+    def loaded(self, name, backend=None):
+        with self.lock:
+            return self.key(name, backend) in self.models
+
+    def unload(self, name, backend=None):
+        with self.lock:
+            self.models.pop(self.key(name, backend), None)
+
+    def stats(self):
+        with self.lock:
+            models = dict(self.models)
+        return {
+            "rss_bytes": resident_bytes(),
+            "models": {
+                f"{name}/{backend}": {
+                    "load_seconds": shared.load_seconds,
+                    "parameter_bytes": shared.parameter_bytes(),
+                    "warm": shared.ready.is_set(),
+                }
+                for (name, backend), shared in models.items()
+            },
+        }
+
+
+def resident_bytes():
+    """
+    Resident set size of this process, or 0 if it can't be determined.
+    """
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+
+registry = ModelRegistry()
@@ -0,0 +1,80 @@
+import struct
+import threading
+
+import numpy as np
+
+from metrics import metrics
+
+WAV_HEADER_SIZE = 44
+
+
+class PcmEncoder:
+    """
+    Converts float32 audio to 16-bit LINEAR16 PCM, optionally with a WAV
+    header, entirely in memory. Buffers are reused between chunks and only
+    grow, so steady-state encoding does no allocation or disk I/O. Each
+    thread gets its own buffers, so one engine can encode on several
+    workers at once.
+    """
+
+    def __init__(self, samplerate=16000, channels=1):
+        self.samplerate = samplerate
+        self.channels = channels
+        self.local = threading.local()
+
+    def buffers(self):
+        local = self.local
+        if not hasattr(local, "wav"):
+            local.scratch = np.zeros(0, dtype=np.float32)
+            local.wav = bytearray(WAV_HEADER_SIZE)
+        return local
+
+    @property
+    def scratch(self):
+        return self.buffers().scratch
+
+    @property
+    def wav(self):
+        return self.buffers().wav
+
+    def reserve(self, n):
+        if len(self.scratch) < n:
+            self.local.scratch = np.zeros(n, dtype=np.float32)
+            self.local.wav = bytearray(WAV_HEADER_SIZE + 2 * n)
+
+    def to_int16(self, audio):
+        """
+        Scale and clip audio to int16. The result is a view into the WAV
+        buffer and is only valid until the next call.
+        """
+        with metrics.span("preprocess"):
+            audio = np.asarray(audio, dtype=np.float32).reshape(-1)
+            n = len(audio)
+            self.reserve(n)
+            scratch = self.scratch[:n]
+            np.multiply(audio, 32767.0, out=scratch)
+            np.clip(scratch, -32768.0, 32767.0, out=scratch)
+            pcm = np.frombuffer(self.wav, dtype=np.int16, count=n, offset=WAV_HEADER_SIZE)
+            np.copyto(pcm, scratch, casting="unsafe")
+        return pcm
+
+    def pcm_bytes(self, audio):
+        """
+        Raw little-endian LINEAR16 samples as a memoryview.
+        """
+        n = len(self.to_int16(audio))
+        return memoryview(self.wav)[WAV_HEADER_SIZE:WAV_HEADER_SIZE + 2 * n]
+
+    def wav_bytes(self, audio):
+        """
+        A complete 16-bit PCM WAV file as a memoryview.
+        """
+        data_size = 2 * len(self.to_int16(audio))
+        byte_rate = self.samplerate * self.channels * 2
+        struct.pack_into(
+            "<4sI4s4sIHHIIHH4sI", self.wav, 0,
+            b"RIFF", 36 + data_size, b"WAVE",
+            b"fmt ", 16, 1, self.channels, self.samplerate, byte_rate, self.channels * 2, 16,
+            b"data", data_size,
+        )
+        return memoryview(self.wav)[:WAV_HEADER_SIZE + data_size]
@@ -0,0 +1,150 @@
+import time
+from collections import deque
+
+from audiocapture import MicCapture
+from diarization import set_speaker
+from engines import shift_result
+from metrics import metrics
+from vad import EnergyVAD, SpeechSegmenter
+
+
+class TranscriptionPipeline:
+    """
+    Shared capture -> VAD -> engine pipeline behind every front-end.
+
+    Capture runs in the PortAudio callback and feeds a ring buffer, so audio
+    keeps flowing while the engine is busy. Batch engines receive speech
+    segments cut by the VAD; streaming engines receive every block.
+
+    With a diarizer, results get a "speaker": from the engine when it has
+    speaker labels, otherwise from the diarizer on the same VAD segments.
+    """
+
+    def __init__(self, engine, samplerate=16000, block_seconds=0.5, window_seconds=5.0,
+                 max_segment_seconds=15.0, buffer_seconds=30, device=None, diarizer=None, latency_window=1000):
+        self.engine = engine
+        # Only needed for engines that don't label speakers themselves
+        self.diarizer = None if getattr(engine, "speaker_labels", False) else diarizer
+        self.samplerate = samplerate
+        self.block_seconds = block_seconds
+        self.window_seconds = window_seconds
+        self.max_segment_seconds = max_segment_seconds
+        self.buffer_seconds = buffer_seconds
+        self.device = device
+        self.running = False
+        # Only recent latencies are reported, so keep a bounded window
+        self.latencies = deque(maxlen=latency_window)
+
+    def run(self, on_result, on_stats=None):
+        """
+        Capture and transcribe until stop() is called. on_result gets each
+        result dict; on_stats, if given, gets counters after every block
+        (with per-stage timings when metrics are enabled).
+        """
+        self.running = True
+        self.latencies.clear()
+        engine = self.engine
+        segmenter = SpeechSegmenter(EnergyVAD(self.samplerate), max_seconds=self.max_segment_seconds)
+
+        with MicCapture(samplerate=self.samplerate, buffer_seconds=self.buffer_seconds,
+                        device=self.device) as capture:
+            # Audio buffers up while the engine loads models or opens clients.
+            engine.prepare()
+            if engine.streaming:
+                engine.start_stream(self.label_stream(on_result))
+            print("Listening...")
+            overruns = 0
+            while self.running:
+                with metrics.span("capture_wait"):
+                    audio = capture.read(self.block_seconds, timeout=0.5)
+                if audio is None or not len(audio):
+                    continue
+
+                if engine.streaming:
+                    engine.feed(audio)
+                    if self.diarizer is not None:
+                        with metrics.span("preprocess"):
+                            segments = segmenter.push(audio, with_start=True)
+                        for start, segment in segments:
+                            self.diarizer.add_turn(start, segment)
+                else:
+                    with metrics.span("preprocess"):
+                        segments = segmenter.push(audio, with_start=True)
+                    for start, segment in segments:
+                        metrics.count("segments")
+                        behind = capture.buffer.depth() > self.samplerate * self.window_seconds
+                        self.submit(segment, on_result, behind, start)
+
+                stats = capture.stats()
+                if stats["overruns"] > overruns:
+                    overruns = stats["overruns"]
+                    print(f"Audio overrun: {stats['dropped_seconds']:.1f}s dropped so far, "
+                          f"{stats['queue_seconds']:.1f}s queued")
+                if on_stats is not None or metrics.enabled:
+                    stats = self.stats(capture, segmenter)
+                    if on_stats is not None:
+                        on_stats(stats)
+
+        if engine.streaming:
+            engine.end_stream()
+        else:
+            segment = segmenter.flush(with_start=True)
+            if segment is not None:
+                self.submit(segment[1], on_result, False, segment[0])
+            engine.flush()
+            print(f"Skipped {segmenter.stats()['skipped_seconds']:.1f}s of silence")
+
+    def submit(self, segment, on_result, behind, start=0.0):
+        ready = time.monotonic()
+
+        def deliver(result):
+            self.latencies.append(time.monotonic() - ready)
+            # Engine times are relative to the segment; report session time
+            result = shift_result(result, start, len(segment) / self.samplerate)
+            if self.diarizer is not None and not result.get("error"):
+                self.diarizer.label_result(result, segment, start)
+            self.emit(on_result, result)
+
+        try:
+            self.engine.submit(segment, deliver, behind)
+        except Exception as e:
+            print(f"Error during transcription: {e}")
+            self.emit(on_result, {"text": "Transcription failed. Check logs for details.", "final": True,
+                                  "error": True})
+
+    def emit(self, on_result, result):
+        metrics.count("errors" if result.get("error") else "results")
+        with metrics.span("emit"):
+            on_result(result)
+
+    def label_stream(self, on_result):
+        """
+        Label streaming results by the speaker turn they overlap, and time
+        their delivery.
+        """
+        def deliver(result):
+            if self.diarizer is not None and "end" in result:
+                speaker = self.diarizer.speaker_at(result.get("start", result["end"]), result["end"])
+                set_speaker(result, speaker)
+            self.emit(on_result, result)
+
+        return deliver
+
+    def stats(self, capture, segmenter):
+        stats = capture.stats()
+        stats.update(segmenter.stats())
+        stats.update(self.engine.stats())
+        if self.diarizer is not None:
+            stats.update(self.diarizer.stats())
+        if self.latencies:
+            stats["latency_last"] = self.latencies[-1]
+        if metrics.enabled:
+            # Queue depths and drop counters become gauges; stage timings ride along
+            for name, value in stats.items():
+                if isinstance(value, (int, float)):
+                    metrics.gauge(name, value)
+            stats.update(metrics.summary())
+        return stats
+
+    def stop(self):
+        self.running = False
@@ -0,0 +1,236 @@
+import collections
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+
+from engines import TranscriptionEngine, create_engine
+from languageid import streaming_code, whisper_code
+
+
+class BackendHealth:
+    """
+    Rolling window of (latency, ok) for one backend, plus the start times of
+    requests still in flight. A request in flight for longer than timeout
+    counts as a failure until it finishes, so a hung backend shows up as
+    unhealthy without ever returning.
+    """
+
+    def __init__(self, window=50, timeout=None):
+        self.samples = collections.deque(maxlen=window)
+        self.timeout = timeout
+        self.started = {}
+        self.requests = 0
+        self.wins = 0
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            self.requests += 1
+            self.started[self.requests] = time.monotonic()
+            return self.requests
+
+    def finish(self, request, ok):
+        with self.lock:
+            start = self.started.pop(request)
+        self.record(time.monotonic() - start, ok)
+
+    def in_flight(self):
+        with self.lock:
+            return len(self.started)
+
+    def overdue(self):
+        if self.timeout is None:
+            return 0
+        now = time.monotonic()
+        with self.lock:
+            return sum(1 for start in self.started.values() if now - start > self.timeout)
+
+    def record(self, latency, ok):
+        with self.lock:
+            self.samples.append((latency, ok))
+
+    def percentile(self, q):
+        with self.lock:
+            latencies = sorted(latency for latency, ok in self.samples if ok)
+        if not latencies:
+            return None
+        return latencies[int(q * (len(latencies) - 1))]
+
+    def error_rate(self):
+        overdue = self.overdue()
+        with self.lock:
+            if not self.samples and not overdue:
+                return 0.0
+            failures = sum(1 for _, ok in self.samples if not ok) + overdue
+            return failures / (len(self.samples) + overdue)
+
+    def stats(self):
+        return {
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "error_rate": self.error_rate(),
+            "count": len(self.samples),
+            "in_flight": self.in_flight(),
+            "overdue": self.overdue(),
+            "wins": self.wins,
+        }
+
+
+class RouterEngine(TranscriptionEngine):
+    """
+    Sends each segment to the local engine and to the healthy cloud engines
+    at once and returns the first successful result within slo seconds.
+    After the SLO it waits for the local result, and only if that fails too
+    for whichever cloud result comes next, up to cloud_timeout seconds from
+    the start of the request.
+
+    A cloud backend whose rolling error rate is above max_error_rate or whose
+    p95 latency is above the SLO stops being raced; every probe_every-th
+    segment is still sent to it so it can recover. Requests still running
+    past the SLO count as failures, and a backend with max_in_flight
+    requests outstanding is skipped, so a hung backend cannot pile up
+    threads. The local engine has its own threads and never waits behind
+    cloud requests. While the pipeline is behind, only the local engine is
+    used.
+
+    language is passed on to every backend that has none of its own, as a
+    Whisper code for local Whisper and a full code (e.g. "en-US") for the
+    cloud.
+    """
+
+    name = "router"
+
+    def __init__(self, local=None, cloud=None, slo=2.0, window=50, max_error_rate=0.5,
+                 probe_every=10, max_in_flight=2, cloud_timeout=10.0, language=None):
+        super().__init__(language)
+        local = local or {"engine": "whisper"}
+        cloud = [{"engine": "google"}] if cloud is None else cloud
+        self.local = self.build(local, language)
+        self.cloud = [self.build(config, language) for config in cloud]
+        self.slo = slo
+        self.max_error_rate = max_error_rate
+        self.probe_every = probe_every
+        self.max_in_flight = max_in_flight
+        self.cloud_timeout = cloud_timeout
+        self.health = {engine.label: BackendHealth(window, timeout=slo) for engine in [self.local, *self.cloud]}
+        self.requests = 0
+        self.local_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="router-local")
+        # Losing requests run to completion so their latency is still recorded
+        self.executor = ThreadPoolExecutor(max_workers=max(1, max_in_flight * len(self.cloud)),
+                                           thread_name_prefix="router")
+
+    @staticmethod
+    def build(config, language=None):
+        if isinstance(config, TranscriptionEngine):
+            engine = config
+        else:
+            config = dict(config)
+            if language and "language" not in config:
+                config["language"] = backend_language(language, config["engine"])
+            label = config.pop("label", None)
+            engine = create_engine(config)
+            engine.label = label or engine.name
+        if not hasattr(engine, "label"):
+            engine.label = engine.name
+        return engine
+
+    def prepare(self):
+        for engine in [self.local, *self.cloud]:
+            try:
+                engine.prepare()
+            except Exception as e:
+                # Missing credentials or network: route around it until a probe succeeds
+                print(f"Error preparing {engine.label}: {e}")
+                self.health[engine.label].record(0.0, False)
+
+    def healthy(self, engine):
+        health = self.health[engine.label]
+        p95 = health.percentile(0.95)
+        return health.error_rate() <= self.max_error_rate and (p95 is None or p95 <= self.slo)
+
+    def candidates(self, behind):
+        self.requests += 1
+        if behind:
+            return []
+        probe = self.probe_every and self.requests % self.probe_every == 0
+        return [engine for engine in self.cloud
+                if self.health[engine.label].in_flight() < self.max_in_flight and (probe or self.healthy(engine))]
+
+    def submit_to(self, executor, engine, audio, behind):
+        # Counted in flight from submission, so queued requests hold a slot too
+        return executor.submit(self.run, engine, self.health[engine.label].start(), audio, behind)
+
+    def run(self, engine, request, audio, behind):
+        try:
+            result = engine.transcribe(audio, behind)
+        except Exception:
+            self.health[engine.label].finish(request, False)
+            raise
+        self.health[engine.label].finish(request, True)
+        return result
+
+    def decode(self, audio, behind=False):
+        started = time.monotonic()
+        deadline = started + self.slo
+        local = self.submit_to(self.local_executor, self.local, audio, behind)
+        futures = {local: self.local}
+        for engine in self.candidates(behind):
+            futures[self.submit_to(self.executor, engine, audio, behind)] = engine
+
+        # First successful result within the SLO wins
+        pending = set(futures)
+        errors = []
+        while pending:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return self.winner(futures[future], future.result())
+                errors.append(future.exception())
+
+        # Over the SLO: fall back to local, then to any late cloud result
+        if local in pending:
+            pending.discard(local)
+            if local.exception() is None:
+                return self.winner(self.local, local.result())
+            errors.append(local.exception())
+        try:
+            for future in as_completed(pending, timeout=max(0.0, started + self.cloud_timeout - time.monotonic())):
+                if future.exception() is None:
+                    return self.winner(futures[future], future.result())
+                errors.append(future.exception())
+        except TimeoutError:
+            errors.append(TimeoutError(f"no cloud result within {self.cloud_timeout}s"))
+        raise RuntimeError(f"All backends failed: {'; '.join(str(e) for e in errors)}")
+
+    def winner(self, engine, result):
+        self.health[engine.label].wins += 1
+        result = dict(result)
+        result["backend"] = engine.label
+        return result
+
+    def stats(self):
+        stats = {}
+        for label, health in self.health.items():
+            for key, value in health.stats().items():
+                stats[f"{label}_{key}"] = value
+        return stats
+
+    def close(self):
+        self.local_executor.shutdown(wait=False)
+        self.executor.shutdown(wait=False)
+        for engine in [self.local, *self.cloud]:
+            engine.close()
+
+
+def backend_language(language, engine):
+    """
+    The router's language in the form engine expects.
+    """
+    if engine.startswith("whisper"):
+        return whisper_code(language)
+    if engine in ("fake", "router"):
+        return language
+    return streaming_code(language, engine)
@@ -0,0 +1,205 @@
+import threading
+
+import numpy as np
+
+import audiocapture
+from audiocapture import MicCapture, Resampler
+from engines import shift_result
+from jobqueue import FairPool
+from metrics import metrics
+from vad import EnergyVAD, SpeechSegmenter
+
+
+def parse_inputs(specs):
+    """
+    Input specs to (device, channels) pairs: "2" is channel 0 of device 2,
+    "2:0,1" channels 0 and 1, "USB Mic:1" channel 1 of a device by name.
+    """
+    inputs = []
+    for spec in specs:
+        device, _, channels = spec.rpartition(":")
+        if not device or not channels.replace(",", "").isdigit():
+            device, channels = spec, "0"
+        device = int(device) if device.isdigit() else device
+        inputs.append((device, [int(c) for c in channels.split(",")]))
+    return inputs
+
+
+def device_samplerate(device):
+    return int(audiocapture.sd.query_devices(device, "input")["default_samplerate"])
+
+
+class InputGroup:
+    """
+    One input device: all its channels captured unmixed at the device's own
+    rate, resampled together, and VAD'd together, with a segmenter per
+    channel. Silent channels cost only the vectorized numpy work.
+    """
+
+    def __init__(self, device, channels, labels, samplerate=16000, native_rate=None, buffer_seconds=30,
+                 max_segment_seconds=15.0):
+        native_rate = native_rate or device_samplerate(device)
+        self.device = device
+        self.channels = channels
+        self.labels = labels
+        self.capture = MicCapture(samplerate=native_rate, channels=max(channels) + 1,
+                                  blocksize=native_rate // 10, buffer_seconds=buffer_seconds, device=device,
+                                  mix=False)
+        self.resampler = Resampler(native_rate, samplerate, len(channels))
+        self.vad = EnergyVAD(samplerate)
+        self.segmenters = [SpeechSegmenter(self.vad, max_seconds=max_segment_seconds) for _ in channels]
+        self.remainder = np.zeros((0, len(channels)), dtype=np.float32)
+
+    def push(self, block):
+        """
+        Feed one (n, device_channels) block; return (label, start, segment)
+        for every finished segment.
+        """
+        audio = self.resampler(block[:, self.channels])
+        samples = len(audio)
+        audio = np.concatenate([self.remainder, audio])
+        frame_len = self.vad.frame_len
+        n = len(audio) // frame_len
+        self.remainder = audio[n * frame_len:]
+        # (channels, frames, frame_len), one VAD pass for the whole device
+        frames = np.ascontiguousarray(audio[:n * frame_len].T).reshape(len(self.channels), n, frame_len)
+        mask = self.vad.speech_mask(frames)
+
+        segments = []
+        for label, segmenter, channel_frames, channel_mask in zip(self.labels, self.segmenters, frames, mask):
+            for start, segment in segmenter.push_frames(channel_frames, channel_mask, True, samples):
+                segments.append((label, start, segment))
+        return segments
+
+    def flush(self):
+        segments = []
+        for label, segmenter in zip(self.labels, self.segmenters):
+            segment = segmenter.flush(with_start=True)
+            if segment is not None:
+                segments.append((label, *segment))
+        return segments
+
+
+class MultiMicSession:
+    """
+    Transcribe several microphones, or several channels of one interface,
+    at once with one batch engine.
+
+    inputs are (device, channels) pairs (see parse_inputs); each channel is
+    labelled "Mic 1", "Mic 2", ... unless labels are given. One thread reads
+    every device; speech segments from all channels go to a FairPool of
+    workers, which serves the channels in turn, so a talkative channel
+    cannot hold up the others and the work done follows the amount of
+    speech, not the number of microphones. A channel that falls more than
+    max_queued segments behind loses its oldest waiting segment.
+
+    Results are the engine's, shifted to session time, with "channel" set
+    and "speaker" defaulting to the channel label. on_result is called from
+    the workers, one call at a time. A local Whisper model serializes its
+    calls, so extra workers mostly pay off with whisperserver (which
+    batches them) or cloud engines.
+
+    Same run()/stop() interface as TranscriptionPipeline.
+    """
+
+    def __init__(self, engine, inputs, labels=None, samplerate=16000, block_seconds=0.5, workers=2,
+                 max_queued=4, max_segment_seconds=15.0, buffer_seconds=30):
+        if engine.streaming:
+            raise ValueError(f"{engine.name} is a streaming engine; multi-microphone sessions need a batch engine")
+        self.engine = engine
+        self.inputs = inputs
+        count = sum(len(channels) for _, channels in inputs)
+        self.labels = list(labels or [f"Mic {i + 1}" for i in range(count)])
+        self.samplerate = samplerate
+        self.block_seconds = block_seconds
+        self.workers = workers
+        self.max_queued = max_queued
+        self.max_segment_seconds = max_segment_seconds
+        self.buffer_seconds = buffer_seconds
+        self.running = False
+        self.groups = []
+        self.pool = None
+        self.emit_lock = threading.Lock()
+
+    def run(self, on_result, on_stats=None):
+        """
+        Capture and transcribe until stop() is called.
+        """
+        self.running = True
+        labels = iter(self.labels)
+        self.groups = [InputGroup(device, channels, [next(labels) for _ in channels], self.samplerate,
+                                  buffer_seconds=self.buffer_seconds, max_segment_seconds=self.max_segment_seconds)
+                       for device, channels in self.inputs]
+        self.pool = FairPool(self.workers, self.max_queued)
+        try:
+            for group in self.groups:
+                group.capture.start()
+            self.engine.prepare()
+            print(f"Listening on {len(self.labels)} channels...")
+            while self.running:
+                for group in self.groups:
+                    with metrics.span("capture_wait"):
+                        block = group.capture.read(self.block_seconds, timeout=0.5)
+                    if block is None or not len(block):
+                        continue
+                    with metrics.span("preprocess"):
+                        segments = group.push(block)
+                    for label, start, segment in segments:
+                        self.submit(label, start, segment, on_result)
+                if on_stats is not None:
+                    on_stats(self.stats())
+        finally:
+            for group in self.groups:
+                group.capture.stop()
+            for group in self.groups:
+                for label, start, segment in group.flush():
+                    self.submit(label, start, segment, on_result)
+            self.pool.close(wait=True)
+            self.engine.flush()
+
+    def submit(self, label, start, segment, on_result):
+        metrics.count("segments")
+
+        def task():
+            behind = self.pool.waiting(label) > 0
+            try:
+                result = self.engine.transcribe(segment, behind)
+            except Exception as e:
+                print(f"Error during transcription on {label}: {e}")
+                result = {"text": "Transcription failed. Check logs for details.", "final": True, "error": True}
+            result = shift_result(result, start, len(segment) / self.samplerate)
+            result["channel"] = label
+            result.setdefault("speaker", label)
+            metrics.count("errors" if result.get("error") else "results")
+            with self.emit_lock, metrics.span("emit"):
+                on_result(result)
+
+        if not self.pool.submit(label, task):
+            print(f"{label} is behind: dropped its oldest waiting segment")
+
+    def stats(self):
+        stats = {"queue_seconds": 0.0, "dropped_seconds": 0.0, "overruns": 0, "input_overflows": 0,
+                 "audio_seconds": 0.0, "skipped_seconds": 0.0}
+        for group in self.groups:
+            for key, value in group.capture.stats().items():
+                stats[key] = max(stats[key], value) if key == "queue_seconds" else stats[key] + value
+            for segmenter in group.segmenters:
+                segmenter_stats = segmenter.stats()
+                stats["audio_seconds"] += segmenter_stats["audio_seconds"]
+                stats["skipped_seconds"] += segmenter_stats["skipped_seconds"]
+        if stats["audio_seconds"]:
+            stats["skipped_ratio"] = stats["skipped_seconds"] / stats["audio_seconds"]
+        if self.pool is not None:
+            pool = self.pool.stats()
+            stats.update(waiting_segments=pool["waiting"], running_segments=pool["running"],
+                         dropped_segments=pool["dropped_segments"], channels=pool["per_key"])
+        stats.update(self.engine.stats())
+        if metrics.enabled:
+            for name, value in stats.items():
+                if isinstance(value, (int, float)):
+                    metrics.gauge(name, value)
+            stats.update(metrics.summary())
+        return stats
+
+    def stop(self):
+        self.running = False
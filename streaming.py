@@ -0,0 +1,210 @@
+import re
+import numpy as np
+from whisperfeatures import HOP_LENGTH, WindowDecoder, supports_features
+
+SENTENCE_END = (".", "?", "!", "。", "？", "！")
+
+
+def normalize(word):
+    return re.sub(r"[^\w']", "", word.lower())
+
+
+class HypothesisBuffer:
+    """
+    LocalAgreement-2: a word is committed once two consecutive decoding passes
+    agree on it. Words are (start, end, text) tuples in absolute seconds.
+    """
+
+    def __init__(self):
+        self.previous = []
+        self.last_committed_end = 0.0
+        self.committed_tail = []
+
+    def insert(self, words):
+        """
+        Add a new hypothesis and return the words that are now committed.
+        """
+        # Audio up to the last committed word is already settled; anything the
+        # model re-emits there is a repeat of committed text.
+        new = [w for w in words if w[0] > self.last_committed_end - 0.1]
+
+        # The prompt often makes Whisper repeat the last few committed words at
+        # the start of the buffer, so drop the longest such n-gram.
+        for n in range(min(5, len(self.committed_tail), len(new)), 0, -1):
+            tail = [normalize(w[2]) for w in self.committed_tail[-n:]]
+            head = [normalize(w[2]) for w in new[:n]]
+            if tail == head:
+                new = new[n:]
+                break
+
+        committed = []
+        while new and self.previous and normalize(new[0][2]) == normalize(self.previous[0][2]):
+            committed.append(new.pop(0))
+            self.previous.pop(0)
+        self.previous = new
+
+        if committed:
+            self.last_committed_end = committed[-1][1]
+            self.committed_tail = (self.committed_tail + committed)[-5:]
+        return committed
+
+    def tentative(self):
+        return self.previous
+
+    def reset(self):
+        self.previous = []
+
+
+class StreamingTranscriber:
+    """
+    Sliding-window streaming decoder.
+
+    Audio is appended to a growing buffer that is re-decoded on every step with
+    the committed text as the prompt. Only the prefix that is stable across two
+    passes is committed; the rest is reported as tentative. The buffer is
+    trimmed at the end of the last committed sentence so decoding cost stays
+    bounded. Only the committed words still in the buffer are kept, with the
+    text that scrolled out before them folded into the prompt, so memory and
+    per-pass work don't grow with the length of the session; text() is the
+    whole transcript.
+
+    With a PyTorch model, passes go through a WindowDecoder: log-mel frames
+    are computed once as audio arrives instead of for the whole buffer on
+    every pass, and each pass runs the encoder once (transcribe() runs it
+    again for word alignment and for every fallback temperature). Trims are
+    rounded to whole mel frames so the cached frames stay aligned.
+    """
+
+    def __init__(self, model, language="en", samplerate=16000, trim_seconds=15.0, max_seconds=28.0):
+        self.model = model
+        self.language = language
+        self.samplerate = samplerate
+        self.trim_seconds = trim_seconds
+        self.max_seconds = max_seconds
+        self.audio = np.zeros(0, dtype=np.float32)
+        self.offset = 0.0
+        self.committed = []
+        self.last_committed = []
+        self.scrolled = ""
+        self.transcript = ""
+        self.hypothesis = HypothesisBuffer()
+        self.window = WindowDecoder(model) if supports_features(model) else None
+
+    def insert_audio(self, chunk):
+        self.audio = np.concatenate([self.audio, np.asarray(chunk, dtype=np.float32).reshape(-1)])
+
+    def buffer_seconds(self):
+        return len(self.audio) / self.samplerate
+
+    def prompt(self):
+        """
+        Committed text that has already scrolled out of the audio buffer.
+        """
+        return self.scrolled
+
+    def decode(self):
+        if self.window is not None:
+            result = self.window.transcribe(self.audio, self.language, self.prompt() or None)
+        else:
+            result = self.model.transcribe(
+                self.audio,
+                fp16=False,
+                language=self.language,
+                initial_prompt=self.prompt() or None,
+                condition_on_previous_text=False,
+                word_timestamps=True,
+            )
+        if self.language is None:
+            self.language = result.get("language")
+        return [
+            (self.offset + w["start"], self.offset + w["end"], w["word"])
+            for segment in result.get("segments", [])
+            for w in segment.get("words", [])
+        ]
+
+    def process(self):
+        """
+        Run one decoding pass. Returns (newly committed text, tentative text).
+        """
+        self.last_committed = []
+        if not len(self.audio):
+            return "", ""
+        committed = self.hypothesis.insert(self.decode())
+        self.commit(committed)
+        self.trim()
+        self.scroll()
+        return "".join(w[2] for w in committed), "".join(w[2] for w in self.hypothesis.tentative())
+
+    def commit(self, words):
+        self.last_committed = words
+        self.committed.extend(words)
+        self.transcript += "".join(w[2] for w in words)
+
+    def scroll(self):
+        """
+        Move committed words that are out of the buffer into the prompt.
+        """
+        n = 0
+        while n < len(self.committed) and self.committed[n][1] <= self.offset:
+            n += 1
+        if n:
+            self.scrolled = (self.scrolled + "".join(w[2] for w in self.committed[:n]))[-200:]
+            del self.committed[:n]
+
+    def trim(self):
+        if self.buffer_seconds() <= self.trim_seconds:
+            return
+        # Words ending within one hop of the offset were already trimmed up to
+        # (trims are rounded down); cutting there again would not move
+        hop = (HOP_LENGTH if self.window is not None else 1) / self.samplerate
+        in_buffer = [w for w in self.committed if w[1] > self.offset + hop]
+        cut = None
+        for w in reversed(in_buffer):
+            if w[2].strip().endswith(SENTENCE_END):
+                cut = w[1]
+                break
+        if cut is None and self.buffer_seconds() > self.max_seconds and in_buffer:
+            # No sentence boundary yet; keep under Whisper's 30 s window anyway.
+            cut = in_buffer[-1][1]
+        if (cut is None or not self.trim_to(cut)) and self.buffer_seconds() > self.max_seconds:
+            # Nothing committed to cut at: drop the oldest audio and start over
+            self.trim_to(self.offset + self.buffer_seconds() - self.trim_seconds)
+            self.hypothesis.reset()
+
+    def trim_to(self, time):
+        """
+        Drop the audio before time. Returns False if less than a hop would go.
+        """
+        samples = min(int((time - self.offset) * self.samplerate), len(self.audio))
+        if self.window is not None:
+            samples -= samples % HOP_LENGTH
+        if samples <= 0:
+            return False
+        self.audio = self.audio[samples:]
+        self.offset += samples / self.samplerate
+        if self.window is not None:
+            self.window.trimmed(samples)
+        return True
+
+    def skip(self, samples):
+        """
+        Account for audio that is not inserted (silence dropped by a VAD) so
+        word times stay on the stream clock. Only call this with nothing
+        tentative: the buffered audio, already committed, is dropped as well.
+        """
+        self.offset += (len(self.audio) + samples) / self.samplerate
+        self.audio = np.zeros(0, dtype=np.float32)
+        if self.window is not None:
+            self.window.reset()
+
+    def finish(self):
+        """
+        Commit whatever is still tentative at the end of the stream.
+        """
+        remaining = self.hypothesis.tentative()
+        self.commit(remaining)
+        self.hypothesis.reset()
+        return "".join(w[2] for w in remaining)
+
+    def text(self):
+        return self.transcript
@@ -0,0 +1,115 @@
+import json
+
+
+def format_timestamp(seconds, separator=","):
+    milliseconds = int(round(seconds * 1000))
+    hours, milliseconds = divmod(milliseconds, 3_600_000)
+    minutes, milliseconds = divmod(milliseconds, 60_000)
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}{separator}{milliseconds:03d}"
+
+
+def srt_cue(index, start, end, text):
+    return f"{index}\n{format_timestamp(start)} --> {format_timestamp(end)}\n{text.strip()}\n\n"
+
+
+def vtt_cue(start, end, text):
+    return f"{format_timestamp(start, '.')} --> {format_timestamp(end, '.')}\n{text.strip()}\n\n"
+
+
+def to_srt(segments):
+    return "".join(srt_cue(i, s["start"], s["end"], labelled(s["text"], s.get("speaker")))
+                   for i, s in enumerate(segments, 1))
+
+
+def to_vtt(segments):
+    return "WEBVTT\n\n" + "".join(vtt_cue(s["start"], s["end"], labelled(s["text"], s.get("speaker"), "vtt"))
+                                   for s in segments)
+
+
+def labelled(text, speaker, fmt="srt"):
+    if not speaker:
+        return text
+    return f"<v {speaker}>{text.strip()}" if fmt == "vtt" else f"[{speaker}] {text.strip()}"
+
+
+def write_result(result, path, fmt):
+    """
+    Write a Whisper-style result dict as txt, srt, vtt or json.
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        if fmt == "srt":
+            f.write(to_srt(result["segments"]))
+        elif fmt == "vtt":
+            f.write(to_vtt(result["segments"]))
+        elif fmt == "json":
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        else:
+            f.write(result["text"].strip() + "\n")
+
+
+class SubtitleWriter:
+    """
+    Append SRT or VTT cues to a file as final results arrive.
+
+    Words (or whole segments when a backend gives no word times) are grouped
+    into cues that end at a sentence boundary, a change of speaker, after
+    max_seconds, or after max_chars. Labelled speakers are written as a VTT
+    voice tag or an SRT "[speaker]" prefix. Each finished cue is appended and flushed; the file is never
+    rewritten and only the cue in progress is kept in memory, so a session of
+    any length can be captioned live.
+    """
+
+    def __init__(self, path, fmt=None, max_seconds=6.0, max_chars=84):
+        self.fmt = fmt or ("vtt" if path.endswith(".vtt") else "srt")
+        self.max_seconds = max_seconds
+        self.max_chars = max_chars
+        self.file = open(path, "w", encoding="utf-8")
+        if self.fmt == "vtt":
+            self.file.write("WEBVTT\n\n")
+        self.index = 0
+        self.pending = []
+
+    def add(self, result):
+        """
+        Take one result dict; partial and untimed results are ignored.
+        """
+        if not result.get("final", True) or result.get("error"):
+            return
+        for segment in result.get("segments") or []:
+            units = segment.get("words") or [{"word": segment["text"], "start": segment["start"],
+                                              "end": segment["end"]}]
+            for unit in units:
+                self.add_unit(unit, unit.get("speaker", segment.get("speaker", result.get("speaker"))))
+
+    def add_unit(self, unit, speaker=None):
+        unit = dict(unit, speaker=speaker)
+        if self.pending and (unit["end"] - self.pending[0]["start"] > self.max_seconds
+                             or len(self.text()) + len(unit["word"]) > self.max_chars
+                             or speaker != self.pending[0]["speaker"]):
+            self.write_cue()
+        self.pending.append(unit)
+        if unit["word"].strip().endswith((".", "?", "!")):
+            self.write_cue()
+
+    def text(self):
+        return "".join(u["word"] for u in self.pending)
+
+    def write_cue(self):
+        if not self.pending:
+            return
+        start, end, text = self.pending[0]["start"], self.pending[-1]["end"], self.text()
+        speaker = self.pending[0]["speaker"]
+        self.pending = []
+        if not text.strip():
+            return
+        self.index += 1
+        if self.fmt == "vtt":
+            self.file.write(vtt_cue(start, end, labelled(text, speaker, "vtt")))
+        else:
+            self.file.write(srt_cue(self.index, start, end, labelled(text, speaker)))
+        self.file.flush()
+
+    def close(self):
+        self.write_cue()
+        self.file.close()
@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+
+DEFAULT_DIR = os.path.join(os.path.expanduser("~"), ".cache", "whisper-trial", "transcripts")
+
+
+class TranscriptCache:
+    """
+    Content-addressed on-disk cache of transcription results.
+
+    Keys are the SHA-256 of the decoded float32 PCM plus the model (or cloud
+    backend) name, language and decode options, so the same audio is never
+    paid for twice. Entries are JSON files; a hit refreshes the file's mtime
+    and the least recently used entries are evicted once the cache grows past
+    max_bytes. Safe to share between threads and processes.
+    """
+
+    def __init__(self, directory=None, max_bytes=512 * 2**20):
+        self.directory = directory or os.getenv("TRANSCRIPT_CACHE_DIR", DEFAULT_DIR)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        self.size = sum(entry.stat().st_size for entry in os.scandir(self.directory) if entry.is_file())
+
+    def key(self, audio, model, language=None, **options):
+        digest = hashlib.sha256(np.ascontiguousarray(audio, dtype=np.float32).tobytes())
+        digest.update(json.dumps({"model": model, "language": language, "options": options},
+                                 sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + ".json")
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                result = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            with self.lock:
+                self.misses += 1
+            return None
+        with self.lock:
+            self.hits += 1
+        return result
+
+    def put(self, key, result):
+        path = self.path(key)
+        data = json.dumps(result, ensure_ascii=False).encode("utf-8")
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        try:
+            replaced = os.path.getsize(path)
+        except OSError:
+            replaced = 0
+        os.replace(tmp, path)
+        with self.lock:
+            self.size += len(data) - replaced
+            over = self.size > self.max_bytes
+        if over:
+            self.evict()
+
+    def evict(self):
+        """
+        Delete least recently used entries until the cache fits in max_bytes.
+        """
+        entries = [e for e in os.scandir(self.directory) if e.is_file() and e.name.endswith(".json")]
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        size = sum(e.stat().st_size for e in entries)
+        for entry in entries:
+            if size <= self.max_bytes * 0.9:
+                break
+            try:
+                size -= entry.stat().st_size
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+        with self.lock:
+            self.size = size
+
+    def cached(self, audio, model, compute, language=None, **options):
+        """
+        Return the cached result for this audio and configuration, or call
+        compute() and store what it returns. Nothing is stored if it raises.
+        """
+        key = self.key(audio, model, language, **options)
+        result = self.get(key)
+        if result is None:
+            result = compute()
+            self.put(key, result)
+        return result
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hit_rate(), "bytes": self.size}
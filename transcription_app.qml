@@ -1,5 +1,6 @@
 import QtQuick 2.15
 import QtQuick.Controls 2.15
+import QtQuick.Layouts 1.15
 
 ApplicationWindow {
     visible: true
@@ -7,27 +8,91 @@ ApplicationWindow {
     height: 480
     title: "Whisper Transcription App"
 
-    Column {
-        anchors.centerIn: parent
+    ColumnLayout {
+        anchors.fill: parent
+        anchors.margins: 10
         spacing: 10
 
-        Text {
-            id: transcriptionDisplay
-            objectName: "transcriptionDisplay"  // Set objectName for Python access
-            text: "Transcription will appear here..."
-            font.pixelSize: 20
+        // One row per transcript line; only visible rows get delegates, so
+        // hours of transcript scroll as smoothly as a few lines.
+        ListView {
+            id: transcriptView
+            objectName: "transcriptView"  // Set objectName for Python access
+            Layout.fillWidth: true
+            Layout.fillHeight: true
+            clip: true
+            spacing: 4
+            reuseItems: true
+            model: transcriptModel
+            // Follow new lines unless the user has scrolled up
+            property bool following: true
+            onMovementEnded: following = atYEnd
+            onCountChanged: if (following) positionViewAtEnd()
+            onContentHeightChanged: if (following) positionViewAtEnd()
+
+            delegate: Text {
+                width: ListView.view.width
+                wrapMode: Text.Wrap
+                font.pixelSize: 20
+                color: model.final ? "black" : "gray"
+                text: model.speaker ? model.speaker + ": " + model.text : model.text
+            }
+
+            ScrollBar.vertical: ScrollBar {}
+
+            Text {
+                id: transcriptionDisplay
+                objectName: "transcriptionDisplay"  // Set objectName for Python access
+                anchors.centerIn: parent
+                visible: transcriptView.count === 0
+                text: "Transcription will appear here..."
+                font.pixelSize: 20
+            }
         }
 
-        Button {
-            id: startButton
-            objectName: "startButton"  // Set objectName for Python access
-            text: "Start Transcription"
+        RowLayout {
+            spacing: 10
+
+            Button {
+                id: startButton
+                objectName: "startButton"  // Set objectName for Python access
+                text: "Start Transcription"
+            }
+
+            Button {
+                id: stopButton
+                objectName: "stopButton"  // Set objectName for Python access
+                text: "Stop Transcription"
+            }
+
+            ComboBox {
+                id: modelSelector
+                objectName: "modelSelector"  // Shown by the Whisper apps to switch models
+                visible: false
+                model: ["tiny", "base", "small", "medium"]
+            }
         }
+    }
 
-        Button {
-            id: stopButton
-            objectName: "stopButton"  // Set objectName for Python access
-            text: "Stop Transcription"
+    // Rolling per-stage timings and queue depths, shown when metrics are on
+    Rectangle {
+        objectName: "statsOverlay"
+        visible: false
+        property alias text: statsText.text
+        anchors.top: parent.top
+        anchors.right: parent.right
+        anchors.margins: 10
+        width: statsText.implicitWidth + 16
+        height: statsText.implicitHeight + 12
+        radius: 4
+        color: "#c0202020"
+
+        Text {
+            id: statsText
+            anchors.centerIn: parent
+            color: "white"
+            font.family: "monospace"
+            font.pixelSize: 12
         }
     }
-}
\ No newline at end of file
+}
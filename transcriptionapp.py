@@ -0,0 +1,182 @@
+import argparse
+import sys
+from PySide6.QtCore import QThread, Signal, QObject
+from PySide6.QtGui import QGuiApplication
+from PySide6.QtQml import QQmlApplicationEngine
+from diarization import Diarizer
+from engines import ENGINES, create_engine
+from metrics import STAGES, enable_from_env, metrics, serve
+from modelregistry import MODEL_NAMES
+from pipeline import TranscriptionPipeline
+from sessions import MultiMicSession, parse_inputs
+from subtitles import SubtitleWriter
+from transcriptmodel import TranscriptModel
+
+
+class EngineThread(QThread):
+    """
+    Thread to handle microphone input and transcription with any engine.
+    result_signal carries the full result dicts with timings; with a
+    subtitles path (.srt or .vtt) final results are also captioned live.
+    diarize labels speakers, locally when the engine has no labels of its own.
+
+    Results go straight into transcript_model (set by run_app), which
+    coalesces partials in the GUI thread instead of queueing a signal each.
+
+    With inputs ((device, channels) pairs), every channel is transcribed at
+    once by a MultiMicSession and results are labelled by channel.
+    """
+    transcription_signal = Signal(str)
+    result_signal = Signal(dict)
+    stats_signal = Signal(dict)
+
+    def __init__(self, engine, parent=None, subtitles=None, diarize=False, inputs=None, workers=2):
+        super().__init__(parent)
+        self.running = False
+        self.engine = engine
+        if inputs:
+            self.pipeline = MultiMicSession(engine, inputs, workers=workers)
+        else:
+            self.pipeline = TranscriptionPipeline(engine, diarizer=Diarizer() if diarize else None)
+        self.subtitles = subtitles
+        self.writer = None
+        self.transcript_model = None
+
+    def run(self):
+        self.running = True
+        if self.subtitles:
+            self.writer = SubtitleWriter(self.subtitles)
+        try:
+            self.pipeline.run(self.handle_result, self.stats_signal.emit)
+        finally:
+            if self.writer is not None:
+                self.writer.close()
+                self.writer = None
+
+    def handle_result(self, result):
+        speaker = result.get("speaker")
+        self.transcription_signal.emit(f"{speaker}: {result['text'].strip()}" if speaker else result["text"])
+        self.result_signal.emit(result)
+        if self.transcript_model is not None:
+            self.transcript_model.push(result)
+        if self.writer is not None:
+            self.writer.add(result)
+
+    def stop(self):
+        self.running = False
+        self.pipeline.stop()
+
+
+def run_app(transcription_thread, qml_file="transcription_app.qml"):
+    """
+    Load the QML window, wire it to the thread and run the Qt event loop.
+    Returns the exit code.
+    """
+    app = QGuiApplication.instance() or QGuiApplication(sys.argv)
+    engine = QQmlApplicationEngine()
+
+    transcript_model = TranscriptModel()
+    engine.rootContext().setContextProperty("transcriptModel", transcript_model)
+    transcription_thread.transcript_model = transcript_model
+
+    engine.load(qml_file)
+    if not engine.rootObjects():
+        print("Error: Failed to load QML file.")
+        return -1
+
+    root = engine.rootObjects()[0]
+    if root is None:
+        print("Error: Root object not found in QML file.")
+        return -1
+
+    if root.findChild(QObject, "transcriptView") is None:
+        print("Error: 'transcriptView' element not found in QML.")
+        return -1
+
+    root.findChild(QObject, "startButton").clicked.connect(transcription_thread.start)
+    root.findChild(QObject, "stopButton").clicked.connect(transcription_thread.stop)
+
+    # With metrics on, the overlay follows the stats the pipeline emits per block
+    stats_overlay = root.findChild(QObject, "statsOverlay")
+    if stats_overlay is not None and (metrics.enabled or enable_from_env()):
+        stats_overlay.setProperty("visible", True)
+        transcription_thread.stats_signal.connect(
+            lambda stats: stats_overlay.setProperty("text", format_stats(stats))
+        )
+
+    # Engines with switchable local models get the model selector
+    model_selector = root.findChild(QObject, "modelSelector")
+    transcription_engine = transcription_thread.engine
+    if model_selector is not None and hasattr(transcription_engine, "set_model"):
+        model_selector.setProperty("visible", True)
+        model_selector.setProperty("currentIndex", MODEL_NAMES.index(transcription_engine.model_name))
+        model_selector.activated.connect(
+            lambda index: transcription_engine.set_model(MODEL_NAMES[index])
+        )
+
+    return app.exec()
+
+
+def format_stats(stats):
+    """
+    Overlay text: p50/p95 per stage, then queue depth and drops.
+    """
+    lines = []
+    for stage in STAGES:
+        if f"{stage}_p50_ms" in stats:
+            lines.append(f"{stage:<13}{stats[f'{stage}_p50_ms']:7.1f} /{stats[f'{stage}_p95_ms']:7.1f} ms")
+    lines.append(f"{'queue':<13}{stats.get('queue_seconds', 0.0):7.1f} s")
+    lines.append(f"{'dropped':<13}{stats.get('dropped_seconds', 0.0):7.1f} s "
+                 f"({stats.get('overruns', 0)} overruns, {stats.get('input_overflows', 0)} overflows)")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Live transcription with any engine.")
+    parser.add_argument("--engine", default="whisper", choices=list(ENGINES))
+    parser.add_argument("--config", default=None, help="JSON engine config, e.g. {\"engine\": \"google\"}")
+    parser.add_argument("--model", default=None, help="Whisper model name")
+    parser.add_argument("--language", default=None, help="Language code; comma-separated for auto-stream")
+    parser.add_argument("--subtitles", default=None, help="Write live captions to this .srt or .vtt file")
+    parser.add_argument("--diarize", action="store_true", help="Label speakers")
+    parser.add_argument("--metrics", action="store_true", help="Time each stage and show a stats overlay")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="Also serve metrics (Prometheus text at /metrics, JSON at /metrics.json)")
+    parser.add_argument("--input", action="append", default=[], metavar="DEVICE[:CH,CH]",
+                        help="Transcribe these input channels at once, labelled per channel (repeatable)")
+    parser.add_argument("--workers", type=int, default=2, help="Transcription workers shared by the --input channels")
+    args, qt_args = parser.parse_known_args()
+
+    if args.metrics_port:
+        serve(args.metrics_port)
+    elif args.metrics:
+        metrics.enable()
+
+    config = create_config(args)
+    sys.argv[1:] = qt_args
+    thread = EngineThread(create_engine(config), subtitles=args.subtitles, diarize=args.diarize,
+                          inputs=parse_inputs(args.input), workers=args.workers)
+    sys.exit(run_app(thread))
+
+
+def create_config(args):
+    if args.config:
+        from engines import load_config
+        return load_config(args.config)
+    config = {"engine": args.engine}
+    if args.model:
+        config["model"] = args.model
+    if args.language and config["engine"] == "auto-stream":
+        config["languages"] = args.language.split(",")
+    elif args.language:
+        config["language"] = args.language
+    if args.subtitles and config["engine"] == "whisper":
+        config["word_timestamps"] = True
+    # Cloud backends that can label speakers themselves
+    if args.diarize and config["engine"] in ("aws", "aws-stream", "google"):
+        config["diarize"] = True
+    return config
+
+
+if __name__ == "__main__":
+    main()
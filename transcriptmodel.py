@@ -0,0 +1,158 @@
+import threading
+
+from PySide6.QtCore import QAbstractListModel, QModelIndex, Qt, QTimer
+
+SENTENCE_END = (".", "?", "!", "。", "？", "！")
+
+
+class TranscriptModel(QAbstractListModel):
+    """
+    Transcript lines for a QML ListView.
+
+    push() may be called from any thread and only records the result: finals
+    are queued and a partial overwrites the previous partial. A GUI-thread
+    timer applies them at most max_fps times a second, so a backend sending
+    dozens of partials a second costs one repaint per frame. Finals become
+    lines (a final that does not end a sentence is appended to the line
+    before it, if the speaker is the same); the latest partial is shown as a
+    single tentative last line that is updated in place. Only the newest
+    max_lines are kept; ListView creates delegates for visible rows only.
+    """
+
+    TextRole = Qt.UserRole + 1
+    SpeakerRole = Qt.UserRole + 2
+    StartRole = Qt.UserRole + 3
+    FinalRole = Qt.UserRole + 4
+
+    def __init__(self, parent=None, max_lines=5000, max_fps=15, max_line_chars=300):
+        super().__init__(parent)
+        self.lines = []
+        self.max_lines = max_lines
+        self.max_line_chars = max_line_chars
+        self.lock = threading.Lock()
+        self.finals = []
+        self.partial = None
+        self.dirty = False
+        self.timer = QTimer(self)
+        self.timer.setInterval(int(1000 / max_fps))
+        self.timer.timeout.connect(self.apply)
+        self.timer.start()
+
+    def roleNames(self):
+        return {
+            self.TextRole: b"text",
+            self.SpeakerRole: b"speaker",
+            self.StartRole: b"start",
+            self.FinalRole: b"final",
+        }
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.lines)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or not 0 <= index.row() < len(self.lines):
+            return None
+        line = self.lines[index.row()]
+        if role in (self.TextRole, Qt.DisplayRole):
+            return line["text"]
+        if role == self.SpeakerRole:
+            return line["speaker"] or ""
+        if role == self.StartRole:
+            return line["start"]
+        if role == self.FinalRole:
+            return line["final"]
+        return None
+
+    def push(self, result):
+        """
+        Record a result dict from any thread; it is shown on the next frame.
+        """
+        with self.lock:
+            if result.get("final", True):
+                self.finals.append(result)
+                # The final supersedes any partial that came before it
+                self.partial = None
+            else:
+                self.partial = result
+            self.dirty = True
+
+    def apply(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            finals, partial = self.finals, self.partial
+            self.finals, self.partial, self.dirty = [], None, False
+
+        for result in finals:
+            self.add_final(result)
+        if partial is not None:
+            self.set_tentative(partial)
+        elif finals:
+            self.set_tentative(None)
+        self.trim()
+
+    def add_final(self, result):
+        text = result["text"].strip()
+        if not text:
+            return
+        self.set_tentative(None)
+        speaker = result.get("speaker")
+        last = self.lines[-1] if self.lines else None
+        if (last is not None and last["speaker"] == speaker and not last["text"].endswith(SENTENCE_END)
+                and len(last["text"]) + len(text) < self.max_line_chars):
+            # No space between CJK pieces
+            last["text"] += (" " if text[:1].isascii() else "") + text
+            self.changed(len(self.lines) - 1)
+            return
+        self.append({"text": text, "speaker": speaker, "start": result.get("start", -1.0), "final": True})
+
+    def set_tentative(self, result):
+        """
+        Show result as the tentative last line, or remove it for None.
+        """
+        has_tentative = bool(self.lines) and not self.lines[-1]["final"]
+        text = result["text"].strip() if result is not None else ""
+        if not text:
+            if has_tentative:
+                row = len(self.lines) - 1
+                self.beginRemoveRows(QModelIndex(), row, row)
+                self.lines.pop()
+                self.endRemoveRows()
+            return
+        line = {"text": text, "speaker": result.get("speaker"), "start": result.get("start", -1.0),
+                "final": False}
+        if has_tentative:
+            self.lines[-1] = line
+            self.changed(len(self.lines) - 1)
+        else:
+            self.append(line)
+
+    def append(self, line):
+        row = len(self.lines)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.lines.append(line)
+        self.endInsertRows()
+
+    def changed(self, row):
+        index = self.index(row, 0)
+        self.dataChanged.emit(index, index)
+
+    def trim(self):
+        extra = len(self.lines) - self.max_lines
+        if extra > 0:
+            self.beginRemoveRows(QModelIndex(), 0, extra - 1)
+            del self.lines[:extra]
+            self.endRemoveRows()
+
+    def text(self):
+        """
+        Finalized transcript currently held, one line per row.
+        """
+        return "\n".join(line["text"] for line in self.lines if line["final"])
+
+    def clear(self):
+        with self.lock:
+            self.finals, self.partial, self.dirty = [], None, False
+        self.beginResetModel()
+        self.lines = []
+        self.endResetModel()
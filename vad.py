@@ -0,0 +1,206 @@
+from collections import deque
+import numpy as np
+
+
+class EnergyVAD:
+    """
+    Lightweight voice activity detector working on whole arrays of frames.
+
+    A frame is speech when its energy is well above an adaptive noise floor and
+    its zero-crossing rate is below that of broadband noise. A pluggable model
+    (any callable taking a (n_frames, frame_len) float32 array and returning
+    per-frame speech probabilities, e.g. a Silero wrapper) can replace the
+    energy/ZCR baseline.
+
+    speech_mask also takes (n_channels, n_frames, frame_len) to decide every
+    channel of a device in one pass, each with its own noise floor.
+    """
+
+    def __init__(self, samplerate=16000, frame_ms=30, threshold_db=9.0, min_db=-55.0, zcr_max=0.35,
+                 model=None, model_threshold=0.5):
+        self.samplerate = samplerate
+        self.frame_len = int(samplerate * frame_ms / 1000)
+        self.threshold_db = threshold_db
+        self.min_db = min_db
+        self.zcr_max = zcr_max
+        self.model = model
+        self.model_threshold = model_threshold
+        self.noise_floor = None
+
+    def frames(self, audio):
+        """
+        View audio as (n_frames, frame_len); a trailing partial frame is ignored.
+        """
+        audio = np.asarray(audio, dtype=np.float32).reshape(-1)
+        n = len(audio) // self.frame_len
+        return audio[:n * self.frame_len].reshape(n, self.frame_len)
+
+    def speech_mask(self, frames):
+        """
+        Boolean speech decision for each frame (the last axis is samples).
+        """
+        if not frames.shape[-2]:
+            return np.zeros(frames.shape[:-1], dtype=bool)
+        if self.model is not None:
+            probabilities = np.asarray(self.model(frames.reshape(-1, frames.shape[-1])))
+            return probabilities.reshape(frames.shape[:-1]) >= self.model_threshold
+
+        energy_db = 10 * np.log10(np.mean(frames ** 2, axis=-1) + 1e-10)
+        signs = np.signbit(frames)
+        zcr = np.mean(signs[..., 1:] != signs[..., :-1], axis=-1)
+
+        # Follow the quietest frames down immediately and drift up slowly, so
+        # the floor tracks room noise without being pulled up by speech.
+        quiet = np.percentile(energy_db, 10, axis=-1)
+        if self.noise_floor is None:
+            self.noise_floor = quiet
+        else:
+            self.noise_floor = np.where(quiet < self.noise_floor, quiet,
+                                        self.noise_floor + 0.05 * (quiet - self.noise_floor))
+
+        floor = np.expand_dims(self.noise_floor, -1)
+        loud = (energy_db > floor + self.threshold_db) & (energy_db > self.min_db)
+        return loud & (zcr < self.zcr_max)
+
+    def is_speech(self, audio, min_ratio=0.1):
+        """
+        True if at least min_ratio of the frames in audio contain speech.
+        """
+        mask = self.speech_mask(self.frames(audio))
+        return bool(len(mask)) and mask.mean() >= min_ratio
+
+
+class SpeechSegmenter:
+    """
+    Cut a continuous stream into speech segments at VAD boundaries.
+
+    Audio is pushed in arbitrary block sizes. A segment is emitted after
+    min_silence_ms of non-speech, or when it reaches max_seconds. Segments
+    shorter than min_speech_ms of speech are dropped. Everything not sent on
+    to inference is counted as skipped.
+    """
+
+    def __init__(self, vad=None, min_silence_ms=500, pad_ms=200, max_seconds=15.0, min_speech_ms=250):
+        self.vad = vad or EnergyVAD()
+        frame_ms = 1000 * self.vad.frame_len / self.vad.samplerate
+        self.min_silence = max(1, int(min_silence_ms / frame_ms))
+        self.pad = int(pad_ms / frame_ms)
+        self.max_frames = int(max_seconds * 1000 / frame_ms)
+        self.min_speech = int(min_speech_ms / frame_ms)
+        self.remainder = np.zeros(0, dtype=np.float32)
+        self.preroll = deque(maxlen=self.pad)
+        self.segment = []
+        self.speech_frames = 0
+        self.silence_run = 0
+        self.total_samples = 0
+        self.sent_samples = 0
+        self.frame_index = 0
+        self.segment_start = 0
+
+    def push(self, audio, with_start=False):
+        """
+        Feed audio and return a list of finished segments (float32 arrays).
+        With with_start, return (start_seconds, segment) pairs instead, where
+        start_seconds counts from the first audio pushed.
+        """
+        audio = np.asarray(audio, dtype=np.float32).reshape(-1)
+        samples = len(audio)
+        audio = np.concatenate([self.remainder, audio])
+        frames = self.vad.frames(audio)
+        self.remainder = audio[len(frames) * self.vad.frame_len:]
+        return self.push_frames(frames, self.vad.speech_mask(frames), with_start, samples)
+
+    def push_frames(self, frames, mask, with_start=False, samples=None):
+        """
+        Like push(), for audio already cut into VAD frames with their speech
+        mask, e.g. one channel of a multi-channel VAD pass. samples is the
+        audio length to count (default: the frames).
+        """
+        self.total_samples += len(frames) * self.vad.frame_len if samples is None else samples
+        if not self.segment and not mask.any():
+            # Silence between segments: only the preroll needs the frames
+            self.frame_index += len(frames)
+            if self.pad:
+                self.preroll.extend(frames[-self.pad:])
+            return []
+
+        segments = []
+        for frame, speech in zip(frames, mask):
+            self.frame_index += 1
+            if not self.segment:
+                if speech:
+                    self.segment_start = self.frame_index - 1 - len(self.preroll)
+                    self.segment = list(self.preroll)
+                    self.preroll.clear()
+                else:
+                    self.preroll.append(frame)
+                    continue
+            self.segment.append(frame)
+            if speech:
+                self.speech_frames += 1
+                self.silence_run = 0
+            else:
+                self.silence_run += 1
+            if self.silence_run >= self.min_silence or len(self.segment) >= self.max_frames:
+                segment = self.emit(with_start)
+                if segment is not None:
+                    segments.append(segment)
+        return segments
+
+    def emit(self, with_start=False):
+        # Keep pad frames of trailing silence, drop the rest.
+        keep = len(self.segment) - max(0, self.silence_run - self.pad)
+        frames, speech = self.segment[:keep], self.speech_frames
+        self.segment, self.speech_frames, self.silence_run = [], 0, 0
+        if speech < self.min_speech or not frames:
+            return None
+        segment = np.concatenate(frames)
+        self.sent_samples += len(segment)
+        if with_start:
+            return self.segment_start * self.vad.frame_len / self.vad.samplerate, segment
+        return segment
+
+    def flush(self, with_start=False):
+        """
+        Return the segment in progress, if any, at the end of a session.
+        """
+        return self.emit(with_start) if self.segment else None
+
+    def in_speech(self):
+        return bool(self.segment)
+
+    def stats(self):
+        pending = sum(len(f) for f in self.segment) + len(self.remainder)
+        skipped = max(0, self.total_samples - self.sent_samples - pending)
+        rate = self.vad.samplerate
+        return {
+            "audio_seconds": self.total_samples / rate,
+            "skipped_seconds": skipped / rate,
+            "skipped_ratio": skipped / self.total_samples if self.total_samples else 0.0,
+        }
+
+
+def split_at_silence(audio, samplerate=16000, max_seconds=30.0, min_seconds=20.0, frame_ms=30):
+    """
+    Split long audio into windows of at most max_seconds, cutting each one at
+    the quietest frame between min_seconds and max_seconds. Returns a list of
+    (start_sample, end_sample) pairs.
+    """
+    audio = np.asarray(audio, dtype=np.float32).reshape(-1)
+    frame_len = int(samplerate * frame_ms / 1000)
+    n = len(audio) // frame_len
+    energy = np.mean(audio[:n * frame_len].reshape(n, frame_len) ** 2, axis=1)
+
+    max_len = int(max_seconds * samplerate)
+    min_frames = int(min_seconds * samplerate) // frame_len
+    max_frames = max_len // frame_len
+    windows = []
+    start = 0
+    while len(audio) - start > max_len:
+        first = start // frame_len
+        quiet = first + min_frames + int(np.argmin(energy[first + min_frames:first + max_frames]))
+        end = quiet * frame_len + frame_len // 2
+        windows.append((start, end))
+        start = end
+    windows.append((start, len(audio)))
+    return windows
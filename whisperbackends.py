@@ -0,0 +1,139 @@
+import argparse
+import difflib
+import importlib.util
+import os
+import time
+
+import whisper
+
+BACKENDS = ["torch", "int8", "ctranslate2"]
+
+
+def available(backend):
+    if backend == "ctranslate2":
+        return importlib.util.find_spec("faster_whisper") is not None
+    return backend in BACKENDS
+
+
+def select_backend(backend=None):
+    """
+    Resolve a backend name. None reads WHISPER_BACKEND; "auto" picks the
+    fastest one installed: CTranslate2, then int8 PyTorch on CPU.
+    """
+    backend = backend or os.getenv("WHISPER_BACKEND", "torch")
+    if backend == "auto":
+        import torch
+        if available("ctranslate2"):
+            return "ctranslate2"
+        return "torch" if torch.cuda.is_available() else "int8"
+    if not available(backend):
+        print(f"Backend {backend} is not available, using torch")
+        return "torch"
+    return backend
+
+
+def load_int8(name):
+    """
+    Stock Whisper with every Linear layer dynamically quantized to int8.
+    """
+    import torch
+
+    model = whisper.load_model(name, device="cpu")
+    # Whisper's Linear subclass only adds a dtype cast in forward();
+    # quantize_dynamic matches exact types, so turn them back into nn.Linear.
+    for module in model.modules():
+        if type(module) is whisper.model.Linear:
+            module.__class__ = torch.nn.Linear
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class CTranslate2Model:
+    """
+    faster-whisper (CTranslate2) model behind Whisper's transcribe() call,
+    returning the same result dict shape.
+    """
+
+    def __init__(self, name, compute_type="int8"):
+        from faster_whisper import WhisperModel
+
+        self.model = WhisperModel(name, device="cpu", compute_type=compute_type)
+
+    def transcribe(self, audio, language=None, initial_prompt=None, word_timestamps=False,
+                   beam_size=None, best_of=None, temperature=(0.0, 0.2, 0.4, 0.6, 0.8, 1.0),
+                   condition_on_previous_text=True, **options):
+        segments, info = self.model.transcribe(
+            audio,
+            language=language,
+            initial_prompt=initial_prompt,
+            word_timestamps=word_timestamps,
+            beam_size=beam_size or 1,
+            best_of=best_of or 1,
+            temperature=temperature,
+            condition_on_previous_text=condition_on_previous_text,
+        )
+        segments = [
+            {
+                "start": s.start,
+                "end": s.end,
+                "text": s.text,
+                "words": [
+                    {"start": w.start, "end": w.end, "word": w.word, "probability": w.probability}
+                    for w in (s.words or [])
+                ],
+            }
+            for s in segments
+        ]
+        return {"text": "".join(s["text"] for s in segments), "language": info.language, "segments": segments}
+
+
+def load_model(name, backend="torch"):
+    if backend == "int8":
+        return load_int8(name)
+    if backend == "ctranslate2":
+        return CTranslate2Model(name)
+    return whisper.load_model(name)
+
+
+def similarity(a, b):
+    """
+    Word-level similarity between two transcripts, 1.0 for identical text.
+    """
+    a = a.lower().split()
+    b = b.lower().split()
+    return difflib.SequenceMatcher(None, a, b).ratio() if a or b else 1.0
+
+
+def parity_check(name, backend, audio, language=None):
+    """
+    Transcribe audio with stock PyTorch and with backend; return the
+    similarity of the two transcripts and both decode times.
+    """
+    results = {}
+    for label in ("torch", backend):
+        model = load_model(name, label)
+        start = time.perf_counter()
+        text = model.transcribe(audio, fp16=False, language=language)["text"]
+        results[label] = (text, time.perf_counter() - start)
+    return {
+        "similarity": similarity(results["torch"][0], results[backend][0]),
+        "torch_seconds": results["torch"][1],
+        "backend_seconds": results[backend][1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare a Whisper backend against stock PyTorch output.")
+    parser.add_argument("audio", help="Audio file to transcribe")
+    parser.add_argument("--model", default="base")
+    parser.add_argument("--backend", default="auto", choices=BACKENDS + ["auto"])
+    parser.add_argument("--language", default=None)
+    args = parser.parse_args()
+
+    backend = select_backend(args.backend)
+    report = parity_check(args.model, backend, whisper.load_audio(args.audio), args.language)
+    print(f"{args.model}/{backend}: similarity {report['similarity']:.3f}, "
+          f"{report['backend_seconds']:.1f}s vs {report['torch_seconds']:.1f}s for torch")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,79 +1,92 @@
-import sys
-import whisper
-import sounddevice as sd
-import numpy as np
-import queue
 import threading
+import argparse
+from diarization import Diarizer
+from engines import create_engine
+from pipeline import TranscriptionPipeline
+from subtitles import SubtitleWriter
 
-# Global variables
-audio_queue = queue.Queue()
-stop_event = threading.Event()
 
-def audio_callback(indata, frames, time, status):
+def print_result(result):
     """
-    Callback function to capture audio from the microphone.
+    Print each segment's transcription as soon as it arrives.
     """
-    if status:
-        print(f"Audio stream error: {status}")
-    audio_queue.put(indata.copy())
+    transcription = result.get("text", "").strip()
+    if transcription:
+        speaker = f" [{result['speaker']}]" if result.get("speaker") else ""
+        print(f"\rTranscription{speaker}:", transcription, end="", flush=True)
 
-def transcribe_audio(model, samplerate):
+
+class StreamPrinter:
     """
-    Continuously transcribe audio from the microphone.
+    Streaming mode: committed text is printed normally and the tentative tail
+    dimmed, until a sentence ends.
     """
-    while not stop_event.is_set():
-        try:
-            # Get audio data from the queue
-            audio_data = audio_queue.get(timeout=1.0)
-            audio_data = audio_data.flatten().astype(np.float32)
 
-            # Transcribe the audio chunk
-            result = model.transcribe(audio_data, fp16=False, language="en")
-            transcription = result.get("text", "").strip()
+    def __init__(self):
+        self.line = ""
 
-            # Print the transcription immediately
-            if transcription:
-                print("\rTranscription:", transcription, end="", flush=True)
+    def __call__(self, result):
+        if result["final"]:
+            self.line += result["text"]
+            tentative = ""
+        else:
+            tentative = result["text"]
+        print("\r\033[K" + self.line + "\033[2m" + tentative + "\033[0m", end="", flush=True)
+        if self.line.strip().endswith((".", "?", "!")):
+            print()
+            self.line = ""
 
-        except queue.Empty:
-            continue
-        except Exception as e:
-            print(f"\nError during transcription: {e}")
 
 def main():
-    # Load the Whisper model
-    model_name = "base"  # Use "base" for better real-time performance
-    model = whisper.load_model(model_name)
+    parser = argparse.ArgumentParser(description="Live Whisper transcription from the microphone.")
+    parser.add_argument("--model", default="base", help="Whisper model name")
+    parser.add_argument("--language", default="en", help="Language code, or 'auto' to detect")
+    parser.add_argument("--backend", default=None, choices=["torch", "int8", "ctranslate2", "auto"],
+                        help="Inference backend (default: WHISPER_BACKEND or torch)")
+    parser.add_argument("--stream", action="store_true", help="Sliding-window streaming with committed/tentative text")
+    parser.add_argument("--step", type=float, default=1.0, help="Seconds of audio per capture block")
+    parser.add_argument("--subtitles", default=None, help="Write live captions to this .srt or .vtt file")
+    parser.add_argument("--diarize", action="store_true", help="Label speakers")
+    args = parser.parse_args()
+    language = None if args.language == "auto" else args.language
+
+    # Use "base" for better real-time performance
+    config = {
+        "engine": "whisper-stream" if args.stream else "whisper",
+        "model": args.model,
+        "language": language,
+        "backend": args.backend,
+    }
+    if args.subtitles and not args.stream:
+        config["word_timestamps"] = True
+    engine = create_engine(config)
+    pipeline = TranscriptionPipeline(engine, block_seconds=args.step,
+                                     diarizer=Diarizer() if args.diarize else None)
+
+    printer = StreamPrinter() if args.stream else print_result
+    on_result = printer
+    if args.subtitles:
+        writer = SubtitleWriter(args.subtitles)
 
-    # Set up audio stream parameters
-    samplerate = 16000  # Whisper's expected sample rate
-    blocksize = int(samplerate * 1)  # Process audio in 1-second chunks for real-time feel
-    channels = 1  # Mono audio
+        def on_result(result):
+            printer(result)
+            writer.add(result)
 
-    # Start the audio stream
     print("Starting live transcription... Press Ctrl+C to stop.")
-    with sd.InputStream(
-        samplerate=samplerate,
-        blocksize=blocksize,
-        channels=channels,
-        dtype="float32",
-        callback=audio_callback
-    ):
-        # Start the transcription thread
-        transcription_thread = threading.Thread(
-            target=transcribe_audio,
-            args=(model, samplerate)
-        )
-        transcription_thread.start()
+    transcription_thread = threading.Thread(target=pipeline.run, args=(on_result,))
+    transcription_thread.start()
 
-        # Wait for the user to stop the program
-        try:
-            while True:
-                pass
-        except KeyboardInterrupt:
-            print("\nStopping transcription...")
-            stop_event.set()
-            transcription_thread.join()
+    # Wait for the user to stop the program
+    try:
+        while transcription_thread.is_alive():
+            transcription_thread.join(timeout=0.5)
+    except KeyboardInterrupt:
+        print("\nStopping transcription...")
+        pipeline.stop()
+        transcription_thread.join()
+    if args.subtitles:
+        writer.close()
+    print()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
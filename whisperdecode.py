@@ -0,0 +1,64 @@
+import time
+
+
+class ChunkDecoder:
+    """
+    Single decode path for windows of live audio.
+
+    If a language is pinned it is passed straight to the model. Otherwise the
+    language is detected on the first chunk of the session and reused, so
+    detection is paid once instead of on every window.
+
+    With a budget (seconds per chunk), decoding switches to plain greedy search
+    without temperature fallback while chunks take longer than the budget or
+    the caller reports a backlog, and returns to the normal options once it has
+    caught up.
+
+    word_timestamps adds per-word times to each segment, at the cost of an
+    extra alignment pass per chunk.
+    """
+
+    def __init__(self, model, language=None, budget=None, beam_size=None, word_timestamps=False):
+        self.model = model
+        self.pinned_language = language
+        self.budget = budget
+        self.beam_size = beam_size
+        self.word_timestamps = word_timestamps
+        self.reset()
+
+    def reset(self):
+        """
+        Start a new session: forget the detected language and timing state.
+        """
+        self.detected_language = None
+        self.behind = False
+        self.last_elapsed = 0.0
+
+    @property
+    def language(self):
+        return self.pinned_language or self.detected_language
+
+    def options(self, behind=False):
+        options = {"fp16": False, "language": self.language}
+        if self.word_timestamps:
+            options["word_timestamps"] = True
+        if self.budget is not None and (behind or self.behind):
+            options.update(temperature=0.0, beam_size=None, best_of=None, condition_on_previous_text=False)
+        elif self.beam_size:
+            options["beam_size"] = self.beam_size
+        return options
+
+    def decode(self, audio, behind=False):
+        """
+        Transcribe one chunk and return Whisper's result dict.
+        """
+        start = time.perf_counter()
+        result = self.model.transcribe(audio, **self.options(behind))
+        self.last_elapsed = time.perf_counter() - start
+
+        if self.language is None:
+            self.detected_language = result.get("language")
+            print(f"Detected language: {self.detected_language}")
+        if self.budget is not None:
+            self.behind = self.last_elapsed > self.budget
+        return result
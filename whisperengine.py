@@ -0,0 +1,144 @@
+import queue
+import threading
+
+import numpy as np
+
+from engines import TranscriptionEngine
+from modelregistry import registry
+from streaming import StreamingTranscriber
+from vad import EnergyVAD
+from whisperdecode import ChunkDecoder
+
+
+def words_result(words, final):
+    """
+    Result dict for (start, end, word) tuples from StreamingTranscriber.
+    """
+    text = "".join(w[2] for w in words)
+    result = {"text": text, "final": final}
+    if words:
+        result["start"], result["end"] = words[0][0], words[-1][1]
+        result["segments"] = [{
+            "start": words[0][0],
+            "end": words[-1][1],
+            "text": text,
+            "words": [{"word": w[2], "start": w[0], "end": w[1]} for w in words],
+        }]
+    return result
+
+
+class WhisperEngine(TranscriptionEngine):
+    """
+    Local Whisper on speech segments, through the shared model registry.
+    """
+
+    name = "whisper"
+
+    def __init__(self, model="base", language=None, backend=None, decode_budget=None, cache=False,
+                 word_timestamps=False):
+        super().__init__(language, cache)
+        self.model_name = model
+        self.backend = backend
+        # language=None detects once per session; decode_budget is seconds per chunk.
+        self.decoder = ChunkDecoder(None, language=language, budget=decode_budget,
+                                    word_timestamps=word_timestamps)
+
+    def prepare(self):
+        self.decoder.reset()
+        self.decoder.model = registry.get(self.model_name, self.backend)
+
+    def set_model(self, model_name):
+        """
+        Switch models without restarting. The new model loads in the background
+        and is picked up at the next segment.
+        """
+        self.model_name = model_name
+        registry.preload(model_name, self.backend)
+
+    def cache_key(self):
+        words = "/words" if self.decoder.word_timestamps else ""
+        return f"whisper/{self.model_name}/{self.backend or 'default'}{words}"
+
+    def decode(self, audio, behind=False):
+        if self.decoder.model is None:
+            self.prepare()
+        elif self.decoder.model.name != self.model_name and registry.loaded(self.model_name, self.backend):
+            self.decoder.model = registry.get(self.model_name, self.backend)
+        return self.decoder.decode(audio, behind=behind)
+
+
+class WhisperStreamingEngine(TranscriptionEngine):
+    """
+    LocalAgreement streaming (see streaming.py): committed text is reported as
+    final results, the unstable tail as partial ones, both with word times on
+    the session clock.
+    """
+
+    name = "whisper-stream"
+    streaming = True
+
+    def __init__(self, model="base", language="en", backend=None, samplerate=16000):
+        super().__init__(language)
+        self.model_name = model
+        self.backend = backend
+        self.samplerate = samplerate
+        self.vad = EnergyVAD(samplerate)
+        self.skipped = 0
+        self.queue = None
+        self.thread = None
+        self.streamer = None
+
+    def prepare(self):
+        registry.get(self.model_name, self.backend)
+
+    def start_stream(self, on_result):
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.worker, args=(on_result,), daemon=True)
+        self.thread.start()
+
+    def feed(self, audio):
+        self.queue.put(audio)
+
+    def end_stream(self):
+        self.queue.put(None)
+        self.thread.join()
+
+    def worker(self, on_result):
+        streamer = self.streamer = StreamingTranscriber(registry.get(self.model_name, self.backend),
+                                                        language=self.language, samplerate=self.samplerate)
+        done = False
+        while not done:
+            # Take everything that arrived while the previous pass was running
+            blocks = [self.queue.get()]
+            while not self.queue.empty():
+                blocks.append(self.queue.get_nowait())
+            done = blocks[-1] is None
+            blocks = [b for b in blocks if b is not None]
+            if not blocks:
+                continue
+            audio = np.concatenate(blocks)
+
+            # Nothing pending and no speech: don't grow the buffer or decode
+            if not self.vad.is_speech(audio) and not streamer.hypothesis.tentative():
+                self.skipped += len(audio)
+                streamer.skip(len(audio))
+                continue
+            streamer.insert_audio(audio)
+            try:
+                streamer.process()
+            except Exception as e:
+                print(f"Error during transcription: {e}")
+                continue
+            if streamer.last_committed:
+                on_result(words_result(streamer.last_committed, True))
+            on_result(words_result(streamer.hypothesis.tentative(), False))
+
+        streamer.finish()
+        if streamer.last_committed:
+            on_result(words_result(streamer.last_committed, True))
+
+    def stats(self):
+        stats = {"skipped_seconds": self.skipped / self.samplerate}
+        if self.streamer is not None and self.streamer.window is not None:
+            stats.update(self.streamer.window.stats())
+        return stats
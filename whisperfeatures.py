@@ -0,0 +1,274 @@
+from contextlib import nullcontext
+
+import numpy as np
+
+from metrics import metrics
+
+SAMPLE_RATE = 16000
+N_FFT = 400
+HOP_LENGTH = 160
+N_FRAMES = 3000  # 30 s window
+PAD = N_FFT // 2
+
+
+def supports_features(model):
+    """
+    True for PyTorch Whisper models (plain or int8), whose encoder and
+    decoder can be driven separately. faster-whisper and whisperserver
+    clients only offer transcribe().
+    """
+    return hasattr(model, "dims") and hasattr(model, "encoder") and hasattr(model, "decoder")
+
+
+class IncrementalMel:
+    """
+    Log-mel spectrogram of a rolling audio buffer, matching
+    whisper.log_mel_spectrogram on the same buffer padded with 30 s of
+    silence, as transcribe() computes it.
+
+    STFT frames whose 400-sample window lies inside the audio seen so far
+    never change, so they are kept (as raw log10 power) and only frames that
+    reach new audio are computed on each call. The few frames at the end that
+    still see the zero padding are recomputed every time, as are the two
+    frames at the start after a trim (they use reflect padding of the new
+    first samples). The clamp to max - 8 and the scaling are applied to the
+    assembled window, since they depend on the whole of it.
+    """
+
+    def __init__(self, n_mels=80):
+        self.n_mels = n_mels
+        self.frames = None
+        self.left_stale = False
+        self.filters = None
+        self.window = None
+
+    def reset(self):
+        self.frames = None
+        self.left_stale = False
+
+    def drop(self, samples):
+        """
+        The first samples of the buffer were trimmed. Cached frames stay
+        valid if that is a whole number of hops.
+        """
+        if self.frames is None:
+            return
+        if samples % HOP_LENGTH:
+            self.reset()
+            return
+        self.frames = self.frames[:, samples // HOP_LENGTH:]
+        self.left_stale = True
+
+    def compute(self, audio, start, stop):
+        """
+        Raw log10 mel power for frames start..stop of audio, with whisper's
+        reflect padding on the left and zero padding on the right.
+        """
+        import torch
+        from whisper.audio import mel_filters
+
+        if self.filters is None:
+            self.filters = mel_filters("cpu", self.n_mels)
+            self.window = torch.hann_window(N_FFT)
+        # Frame i covers audio[i * HOP - PAD : i * HOP + PAD]
+        first, last = start * HOP_LENGTH - PAD, (stop - 1) * HOP_LENGTH + PAD
+        left = audio[1:PAD + 1][::-1][max(0, PAD + first):] if first < 0 else np.zeros(0, np.float32)
+        middle = audio[max(0, first):min(len(audio), last)]
+        right = np.zeros(max(0, last - max(len(audio), first)), np.float32)
+        signal = torch.from_numpy(np.concatenate([left, middle, right]).astype(np.float32))
+        stft = torch.stft(signal, N_FFT, HOP_LENGTH, window=self.window, center=False, return_complex=True)
+        return torch.clamp(self.filters @ stft.abs() ** 2, min=1e-10).log10()
+
+    def __call__(self, audio):
+        """
+        Return (mel, content_frames): the normalized (n_mels, 3000) window for
+        audio (float32, at most 30 s) and how many frames hold audio.
+        """
+        import torch
+
+        with metrics.span("preprocess"):
+            audio = audio[:N_FRAMES * HOP_LENGTH]
+            mel = torch.zeros((self.n_mels, N_FRAMES))
+            if len(audio) <= PAD:
+                return mel, 0
+            stable = (len(audio) - PAD) // HOP_LENGTH + 1
+            if self.frames is None:
+                self.frames = torch.zeros((self.n_mels, 0))
+            have = min(self.frames.shape[1], stable)
+            if self.left_stale and have:
+                self.frames[:, :min(2, have)] = self.compute(audio, 0, min(2, have))
+            self.left_stale = False
+            if stable > have:
+                self.frames = torch.cat([self.frames[:, :have], self.compute(audio, have, stable)], dim=1)
+
+            content = len(audio) // HOP_LENGTH
+            # Frames after the stable ones overlap the zero padding; whisper's
+            # clamp also sees those, so compute all that touch any audio
+            tail_end = (len(audio) + PAD + HOP_LENGTH - 1) // HOP_LENGTH
+            raw = torch.cat([self.frames[:, :stable], self.compute(audio, stable, tail_end)], dim=1)
+            log_spec = torch.maximum(raw, raw.max() - 8.0)
+            mel[:, :content] = ((log_spec + 4.0) / 4.0)[:, :content]
+        return mel, content
+
+
+class EncodedModel:
+    """
+    A Whisper model whose forward pass reuses already computed audio
+    features, so word alignment (which calls model(mel, tokens)) does not
+    run the encoder a second time.
+    """
+
+    def __init__(self, model, features):
+        self.model = model
+        self.features = features
+
+    def __call__(self, mel, tokens):
+        return self.model.decoder(tokens, self.features)
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+
+class WindowDecoder:
+    """
+    Transcribes one window of at most 30 s from an IncrementalMel, running
+    the encoder once per pass. whisper.decode accepts encoded features in
+    place of a mel, so temperature fallback retries, word alignment and
+    language detection all reuse the same encoder output.
+
+    Results have the shape transcribe() returns (text, language, segments
+    with words). Unlike transcribe(), an unfinished last segment is kept
+    instead of being decoded again from its start.
+    """
+
+    temperatures = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)
+    compression_ratio_threshold = 2.4
+    logprob_threshold = -1.0
+    no_speech_threshold = 0.6
+
+    def __init__(self, model):
+        self.model = model
+        self.mel = IncrementalMel(model.dims.n_mels)
+        self.encodes = 0
+
+    def trimmed(self, samples):
+        self.mel.drop(samples)
+
+    def reset(self):
+        self.mel.reset()
+
+    def encode(self, audio):
+        """
+        Encoder output for audio and the number of mel frames it has.
+        """
+        import torch
+
+        mel, content = self.mel(audio)
+        with metrics.span("encode"), torch.no_grad():
+            features = self.model.encoder(mel.unsqueeze(0).to(self.model.device))
+        self.encodes += 1
+        return features, content
+
+    def transcribe(self, audio, language=None, initial_prompt=None, word_timestamps=True):
+        import torch
+        from whisper.tokenizer import get_tokenizer
+
+        # Decoding installs hooks on the model; SharedModel serializes that
+        with getattr(self.model, "lock", None) or nullcontext():
+            features, content = self.encode(audio)
+            with metrics.span("decode"), torch.no_grad():
+                model = self.model
+                if language is None:
+                    if model.is_multilingual:
+                        _, probs = model.detect_language(features)
+                        language = max(probs[0], key=probs[0].get)
+                    else:
+                        language = "en"
+                tokenizer = get_tokenizer(model.is_multilingual, num_languages=model.num_languages,
+                                          language=language, task="transcribe")
+                prompt = tokenizer.encode(" " + initial_prompt.strip()) if initial_prompt else None
+                result = self.decode_with_fallback(features, language, prompt)
+                segments = self.segments(tokenizer, result, features, content, word_timestamps)
+        return {"text": "".join(s["text"] for s in segments), "language": language, "segments": segments}
+
+    def is_silence(self, result):
+        # Same no-speech check as transcribe()
+        return result.no_speech_prob > self.no_speech_threshold and result.avg_logprob < self.logprob_threshold
+
+    def needs_fallback(self, result):
+        if self.is_silence(result):
+            return False
+        return (result.compression_ratio > self.compression_ratio_threshold
+                or result.avg_logprob < self.logprob_threshold)
+
+    def decode_with_fallback(self, features, language, prompt, temperatures=None, beam_size=None, best_of=None):
+        """
+        Decode features (a batch of one) at each temperature in turn until
+        the result passes transcribe()'s quality checks.
+        """
+        import whisper
+
+        for temperature in temperatures or self.temperatures:
+            options = whisper.DecodingOptions(language=language, prompt=prompt, temperature=temperature,
+                                              fp16=False, beam_size=None if temperature > 0 else beam_size,
+                                              best_of=best_of if temperature > 0 else None)
+            result = whisper.decode(self.model, features, options)[0]
+            if not self.needs_fallback(result):
+                break
+        return result
+
+    def segments(self, tokenizer, result, features, content, word_timestamps=True):
+        """
+        Timed segments of one decoding result (none for silence), with words
+        aligned against features (a batch of one) if asked for.
+        """
+        from whisper.timing import add_word_timestamps
+
+        if self.is_silence(result):
+            return []
+        segments = self.split_segments(tokenizer, result, content)
+        if word_timestamps and segments:
+            # The mel argument is unused: EncodedModel decodes from the features
+            add_word_timestamps(segments=segments, model=EncodedModel(self.model, features),
+                                tokenizer=tokenizer, mel=features[0], num_frames=content,
+                                last_speech_timestamp=0.0)
+        return segments
+
+    def split_segments(self, tokenizer, result, content):
+        """
+        Cut the token stream at timestamp pairs, as transcribe() does.
+        """
+        tokens = result.tokens
+        precision = HOP_LENGTH * 2 / SAMPLE_RATE  # one timestamp token per 20 ms
+        segments, start = [], 0
+        for i, token in enumerate(tokens):
+            if token >= tokenizer.timestamp_begin and i > start and tokens[i - 1] >= tokenizer.timestamp_begin:
+                segments.append(tokens[start:i])
+                start = i
+        if start < len(tokens):
+            segments.append(tokens[start:])
+
+        duration = content * HOP_LENGTH / SAMPLE_RATE
+        timed = []
+        for piece in segments:
+            stamps = [t - tokenizer.timestamp_begin for t in piece if t >= tokenizer.timestamp_begin]
+            text_tokens = [t for t in piece if t < tokenizer.eot]
+            if not text_tokens:
+                continue
+            start_time = stamps[0] * precision if stamps else 0.0
+            end_time = stamps[-1] * precision if len(stamps) > 1 else duration
+            timed.append({
+                "seek": 0,
+                "start": start_time,
+                "end": max(start_time, min(end_time, duration)),
+                "text": tokenizer.decode(text_tokens),
+                "tokens": list(piece),
+                "temperature": result.temperature,
+                "avg_logprob": result.avg_logprob,
+                "compression_ratio": result.compression_ratio,
+                "no_speech_prob": result.no_speech_prob,
+            })
+        return timed
+
+    def stats(self):
+        return {"encoder_passes": self.encodes}
@@ -0,0 +1,324 @@
+import argparse
+import json
+import queue
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+from urllib.request import Request, urlopen
+
+import numpy as np
+
+from metrics import metrics
+from whisperfeatures import WindowDecoder
+
+# transcribe()'s fallback temperatures, used when a request gives none
+TEMPERATURES = WindowDecoder.temperatures
+
+
+class Metrics:
+    """
+    Rolling per-request latency and batch-size counters.
+    """
+
+    def __init__(self, window=1000):
+        self.lock = threading.Lock()
+        self.latencies = deque(maxlen=window)
+        self.batch_sizes = Counter()
+        self.requests = 0
+        self.errors = 0
+
+    def record_batch(self, size):
+        with self.lock:
+            self.batch_sizes[size] += 1
+
+    def record_request(self, latency, ok=True):
+        with self.lock:
+            self.requests += 1
+            self.errors += 0 if ok else 1
+            self.latencies.append(latency)
+
+    def snapshot(self):
+        with self.lock:
+            latencies = np.array(self.latencies) if self.latencies else np.zeros(1)
+            batches = sum(self.batch_sizes.values())
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "latency_p50": float(np.percentile(latencies, 50)),
+                "latency_p95": float(np.percentile(latencies, 95)),
+                "batches": batches,
+                "mean_batch_size": sum(k * v for k, v in self.batch_sizes.items()) / batches if batches else 0.0,
+                "batch_sizes": {str(k): v for k, v in sorted(self.batch_sizes.items())},
+            }
+
+
+class Batcher:
+    """
+    Collects concurrent requests for one model and decodes them together.
+
+    Requests waiting at the same time (up to max_batch, or max_wait seconds
+    after the first one arrives) have their log-mel spectrograms stacked and
+    go through a single encoder forward pass. Requests that differ in
+    language, prompt or sampling options are decoded as separate batches.
+
+    Each result then gets what transcribe() would do for a window of up to
+    30 s: temperature fallback (one request at a time, reusing its encoder
+    output), the no-speech check, timed segments and, if asked for, word
+    timestamps.
+    """
+
+    def __init__(self, shared, metrics, max_batch=8, max_wait=0.05):
+        self.shared = shared
+        self.metrics = metrics
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = queue.Queue()
+        self.window = None
+        threading.Thread(target=self.loop, daemon=True).start()
+
+    def submit(self, audio, options=None):
+        """
+        Queue audio for decoding with options from parse_options().
+        """
+        options = options or {}
+        key = (options.get("language"), options.get("initial_prompt"), options.get("temperature", TEMPERATURES),
+               options.get("beam_size"), options.get("best_of"))
+        future = Future()
+        self.queue.put((audio, key, options.get("word_timestamps", False), future, time.perf_counter()))
+        return future
+
+    def loop(self):
+        while True:
+            pending = [self.queue.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(pending) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    pending.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            by_key = {}
+            for item in pending:
+                by_key.setdefault(item[1], []).append(item)
+            for key, items in by_key.items():
+                self.decode(key, items)
+
+    def decode(self, key, items):
+        import torch
+        import whisper
+        from whisper.tokenizer import get_tokenizer
+        from whisperfeatures import HOP_LENGTH, N_FRAMES
+
+        language, prompt, temperatures, beam_size, best_of = key
+        model = self.shared.model
+        if self.window is None:
+            self.window = WindowDecoder(model)
+        try:
+            mels = [
+                whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), model.dims.n_mels)
+                for audio, _, _, _, _ in items
+            ]
+            temperature = temperatures[0]
+            options = whisper.DecodingOptions(language=language, prompt=prompt, temperature=temperature, fp16=False,
+                                              beam_size=None if temperature > 0 else beam_size,
+                                              best_of=best_of if temperature > 0 else None)
+            outputs = []
+            with self.shared.lock, torch.no_grad():
+                features = model.encoder(torch.stack(mels).to(model.device))
+                results = whisper.decode(model, features, options)
+                for i, ((audio, _, word_timestamps, _, _), result) in enumerate(zip(items, results)):
+                    one = features[i:i + 1]
+                    if len(temperatures) > 1 and self.window.needs_fallback(result):
+                        result = self.window.decode_with_fallback(one, result.language, prompt, temperatures[1:],
+                                                                  beam_size, best_of)
+                    tokenizer = get_tokenizer(model.is_multilingual, num_languages=model.num_languages,
+                                              language=result.language, task="transcribe")
+                    content = min(len(audio) // HOP_LENGTH, N_FRAMES)
+                    segments = self.window.segments(tokenizer, result, one, content, word_timestamps)
+                    outputs.append({"text": "".join(s["text"] for s in segments), "language": result.language,
+                                    "segments": segments})
+            self.metrics.record_batch(len(items))
+            for (_, _, _, future, start), output in zip(items, outputs):
+                latency = time.perf_counter() - start
+                self.metrics.record_request(latency)
+                future.set_result(dict(output, latency=latency))
+        except Exception as e:
+            print(f"Error during batched decode: {e}")
+            for _, _, _, future, start in items:
+                self.metrics.record_request(time.perf_counter() - start, ok=False)
+                future.set_exception(e)
+
+
+class WhisperServer:
+    """
+    Holds the models and one Batcher per model for the HTTP handler.
+    """
+
+    def __init__(self, max_batch=8, max_wait=0.05, backend="torch"):
+        self.backend = backend
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.metrics = Metrics()
+        self.batchers = {}
+        self.lock = threading.Lock()
+
+    def batcher(self, model_name):
+        from modelregistry import registry
+
+        with self.lock:
+            if model_name not in self.batchers:
+                self.batchers[model_name] = Batcher(registry.get(model_name, self.backend), self.metrics,
+                                                    self.max_batch, self.max_wait)
+            return self.batchers[model_name]
+
+    def transcribe(self, audio, model_name="base", options=None):
+        return self.batcher(model_name).submit(audio, options).result()
+
+
+def parse_options(params):
+    """
+    Decoding options from /transcribe query parameters.
+    """
+    options = {}
+    for name in ("language", "initial_prompt"):
+        if params.get(name):
+            options[name] = params[name]
+    if "temperature" in params:
+        options["temperature"] = tuple(float(t) for t in params["temperature"].split(","))
+    for name in ("beam_size", "best_of"):
+        if params.get(name):
+            options[name] = int(params[name])
+    options["word_timestamps"] = params.get("word_timestamps") == "1"
+    return options
+
+
+def make_handler(server):
+    class Handler(BaseHTTPRequestHandler):
+        """
+        POST /transcribe?model=base&language=en with a float32 PCM body (16 kHz
+        mono, up to 30 s); also initial_prompt, temperature (comma-separated
+        fallback temperatures), beam_size, best_of and word_timestamps=1.
+        GET /metrics returns latency and batch statistics.
+        """
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            if url.path != "/transcribe":
+                self.send_error(404)
+                return
+            params = {k: v[0] for k, v in parse_qs(url.query).items()}
+            try:
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                audio = np.frombuffer(body, dtype=np.float32).copy()
+                options = parse_options(params)
+            except ValueError as e:
+                self.send_json({"error": f"Bad request: {e}"}, status=400)
+                return
+            try:
+                result = server.transcribe(audio, params.get("model", "base"), options)
+            except Exception as e:
+                self.send_json({"error": str(e)}, status=500)
+                return
+            self.send_json(result)
+
+        def do_GET(self):
+            if urlparse(self.path).path != "/metrics":
+                self.send_error(404)
+                return
+            self.send_json(server.metrics.snapshot())
+
+        def send_json(self, payload, status=200):
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+class RemoteModel:
+    """
+    Client for a running whisperserver with the same transcribe() call as a
+    local model, so front-ends can use it in place of one. Audio longer than
+    30 s is truncated by the server. Options the server cannot honour raise
+    TypeError; fp16 and condition_on_previous_text (there is no previous
+    window) are ignored.
+    """
+
+    forwarded = ("initial_prompt", "word_timestamps", "temperature", "beam_size", "best_of")
+    ignored = ("fp16", "condition_on_previous_text", "verbose")
+
+    def __init__(self, name, url):
+        self.name = name
+        self.url = url.rstrip("/")
+        self.load_seconds = 0.0
+        self.ready = threading.Event()
+        self.ready.set()
+
+    def parameter_bytes(self):
+        return 0
+
+    def transcribe(self, audio, language=None, **options):
+        unsupported = set(options) - set(self.forwarded) - set(self.ignored)
+        if unsupported:
+            raise TypeError(f"whisperserver does not support {', '.join(sorted(unsupported))}")
+        params = {"model": self.name}
+        if language:
+            params["language"] = language
+        if options.get("initial_prompt"):
+            params["initial_prompt"] = options["initial_prompt"]
+        if options.get("word_timestamps"):
+            params["word_timestamps"] = "1"
+        if options.get("temperature") is not None:
+            temperature = options["temperature"]
+            temperatures = temperature if isinstance(temperature, (list, tuple)) else [temperature]
+            params["temperature"] = ",".join(str(t) for t in temperatures)
+        for name in ("beam_size", "best_of"):
+            if options.get(name):
+                params[name] = options[name]
+        body = np.asarray(audio, dtype=np.float32).tobytes()
+        request = Request(f"{self.url}/transcribe?{urlencode(params)}", data=body,
+                          headers={"Content-Type": "application/octet-stream"})
+        with metrics.span("rpc"), urlopen(request) as response:
+            result = json.load(response)
+        result.setdefault("segments", [])
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Whisper transcription server with batched inference.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--preload", nargs="*", default=["base"], help="Models to load at startup")
+    parser.add_argument("--backend", default="torch", choices=["torch", "int8"],
+                        help="Batched decoding needs a PyTorch model")
+    parser.add_argument("--max-batch", type=int, default=8)
+    parser.add_argument("--max-wait-ms", type=float, default=50)
+    args = parser.parse_args()
+
+    server = WhisperServer(args.max_batch, args.max_wait_ms / 1000, args.backend)
+    for name in args.preload:
+        server.batcher(name)
+
+    httpd = ThreadingHTTPServer((args.host, args.port), make_handler(server))
+    print(f"Serving Whisper on http://{args.host}:{args.port}")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping server...")
+        httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
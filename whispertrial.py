@@ -1,7 +1,11 @@
+import time
 import streamlit as st
-import whisper
-import torch
-from io import BytesIO
+from modelregistry import registry
+from transcriptcache import TranscriptCache
+from subtitles import format_timestamp, to_srt, to_vtt
+from audiodecode import StreamingDecoder
+from engines import shift_result
+from jobqueue import DONE, FAILED, JobQueue
 
 st.title("Audio Transcription with Whisper (Tiny Model)")
 
@@ -10,27 +14,74 @@ uploaded_file = st.file_uploader("Upload an audio file", type=["wav", "mp3", "m4
 # Loading the Whisper tiny model (70MB)
 @st.cache_resource
 def load_model():
-    model = whisper.load_model("tiny")
+    model = registry.get("tiny")
     return model
 
 model = load_model()
 
-def transcribe_audio(audio_file):
-    audio = whisper.load_audio(audio_file)
-    
-    result = model.transcribe(audio)
-    
-    return result["text"]
+# Re-uploads of the same audio are served from the on-disk cache
+@st.cache_resource
+def load_cache():
+    return TranscriptCache()
+
+cache = load_cache()
+
+# One queue shared by every session: uploads are transcribed in the
+# background, two at a time, instead of inside each user's script run.
+@st.cache_resource
+def load_jobs():
+    return JobQueue(workers=2)
+
+jobs = load_jobs()
+
+def transcribe_audio(data, progress):
+    # Decoded in memory through ffmpeg, so concurrent uploads never share a
+    # file, and transcribed window by window while decoding continues, so
+    # memory stays flat and text appears within seconds even for long files.
+    decoder = StreamingDecoder(data)
+    texts, segments = [], []
+    for offset, window in decoder.windows():
+        # Keep Whisper's segment timing (with per-word times) instead of just the text
+        result = cache.cached(window, "tiny/words", lambda: model.transcribe(window, word_timestamps=True))
+        texts.append(result["text"].strip())
+        # Segment and word times are relative to the window
+        segments.extend(shift_result(result, offset).get("segments", []))
+        progress(decoder.progress(), " ".join(t for t in texts if t))
+
+    return {"text": " ".join(t for t in texts if t), "segments": segments}
 
 if uploaded_file is not None:
     st.audio(uploaded_file, format="audio/wav")
-    
+
     if st.button("Transcribe"):
-        with st.spinner("Transcribing..."):
-            with open("temp_audio", "wb") as f:
-                f.write(uploaded_file.getbuffer())
-            
-            transcription = transcribe_audio("temp_audio")
-            
-            st.success("Transcription Complete!")
-            st.text_area("Transcription", transcription, height=200)
\ No newline at end of file
+        try:
+            st.session_state["job_id"] = jobs.submit(transcribe_audio, uploaded_file.getvalue()).id
+        except RuntimeError as e:
+            st.error(str(e))
+
+job = jobs.get(st.session_state.get("job_id"))
+if job is not None:
+    if job.status == FAILED:
+        st.error(f"Transcription failed: {job.error}")
+    elif job.status == DONE:
+        result = job.result
+
+        st.success("Transcription Complete!")
+        st.text_area("Transcription", result["text"], height=200)
+        st.table([
+            {"start": format_timestamp(seg["start"], "."), "end": format_timestamp(seg["end"], "."),
+             "text": seg["text"].strip()}
+            for seg in result["segments"]
+        ])
+        st.download_button("Download SRT", to_srt(result["segments"]), file_name="transcription.srt")
+        st.download_button("Download VTT", to_vtt(result["segments"]), file_name="transcription.vtt")
+    else:
+        position = jobs.position(job)
+        if position:
+            st.info(f"Waiting in queue: position {position}")
+        st.progress(job.progress, text="Transcribing...")
+        if job.partial:
+            st.text_area("Transcription so far", job.partial, height=200)
+        # Poll until the background job finishes
+        time.sleep(1)
+        st.rerun()